@@ -0,0 +1,94 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
+
+from pathfinding import PathEvent, SearchEvent
+
+class CancelToken:
+    def __init__(self) -> None:
+        self.event = threading.Event()
+
+    def cancel(self) -> None:
+        self.event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+class SearchJob:
+    def __init__(self, make_events:Callable[[], Iterator[SearchEvent]], batch_size:int=256, max_batches:int=64) -> None:
+        self.make_events = make_events
+        self.batch_size = batch_size
+        self.token = CancelToken()
+
+        # lists of events ending with a PathEvent, or the exception the search raised.
+        # bounded so a slow animation holds the worker back instead of piling up events
+        self.results = queue.Queue(max_batches)
+
+    def cancel(self) -> None:
+        self.token.cancel()
+
+    def poll(self) -> list:
+        # everything the worker sent so far, never blocks the UI thread
+        items = []
+        while True:
+            try:
+                items.append(self.results.get_nowait())
+            except queue.Empty:
+                return items
+
+    def run(self) -> None:
+        # runs on the worker thread, every event is one expanded node so the token is checked per node
+        if self.token.cancelled:
+            return
+        try:
+            events = self.make_events()
+            batch = []
+            for event in events:
+                if self.token.cancelled:
+                    events.close()
+                    return
+                batch.append(event)
+                if type(event) == PathEvent:
+                    self._put(batch)
+                    return
+                if len(batch) >= self.batch_size:
+                    self._put(batch)
+                    batch = []
+
+            # a search that ended without a path event still tells the UI it is over
+            batch.append(PathEvent(path=[]))
+            self._put(batch)
+        except Exception as error:
+            self._put(error)
+
+    def _put(self, item) -> None:
+        while not self.token.cancelled:
+            try:
+                self.results.put(item, timeout=0.05)
+                return
+            except queue.Full:
+                continue
+
+class SearchRunner:
+    def __init__(self) -> None:
+        # one worker: a new search starts once the cancelled one has let go of its grid or planner
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+        self.job = None
+
+    def submit(self, make_events:Callable[[], Iterator[SearchEvent]], batch_size:int=256) -> SearchJob:
+        # the events are created on the worker thread, the old search is cancelled right away
+        self.cancel()
+        self.job = SearchJob(make_events, batch_size)
+        self.executor.submit(self.job.run)
+        return self.job
+
+    def cancel(self) -> None:
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+
+    def shutdown(self) -> None:
+        self.cancel()
+        self.executor.shutdown(wait=False)
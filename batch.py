@@ -0,0 +1,71 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Iterable
+
+from pathfinding import ALGORITHMS, Grid
+
+# per worker process state, set once by the pool initializer
+_worker_blocks = None
+_worker_grid = None
+_worker_search = None
+
+def solve_batch(grid:Grid, queries:Iterable[tuple[int, int]], algorithm:str="A*", workers:int=None, chunk_size:int=512) -> tuple[array, array]:
+    # queries may be (start, goal) pairs or a flat sequence of start, goal, start, goal, ...
+    pairs = array("i")
+    for query in queries:
+        if isinstance(query, int):
+            pairs.append(query)
+        else:
+            pairs.extend(query)
+    if len(pairs) % 2:
+        raise ValueError("queries must hold a goal for every start")
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"unknown algorithm {algorithm}")
+
+    # the grid is copied into shared memory once, tasks only carry their query chunk.
+    # terrain costs get a second block laid out like the cells
+    blocks = [shared_memory.SharedMemory(create=True, size=len(grid.cells))]
+    try:
+        blocks[0].buf[:len(grid.cells)] = grid.cells
+        if grid.costs is not None:
+            blocks.append(shared_memory.SharedMemory(create=True, size=len(grid.costs)))
+            blocks[1].buf[:len(grid.costs)] = grid.costs
+        chunks = [pairs[index:index + 2 * chunk_size] for index in range(0, len(pairs), 2 * chunk_size)]
+        initargs = ([block.name for block in blocks], grid.width, grid.height, algorithm)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=initargs) as pool:
+            results = list(pool.map(_solve_chunk, chunks))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    # path i is indices[offsets[i]:offsets[i + 1]], an empty slice if there is no path
+    offsets = array("q", [0])
+    indices = array("i")
+    for lengths, chunk_indices in results:
+        for length in lengths:
+            offsets.append(offsets[-1] + length)
+        indices.extend(chunk_indices)
+    return offsets, indices
+
+def _attach(shm_names:list[str], width:int, height:int, algorithm:str) -> None:
+    global _worker_blocks, _worker_grid, _worker_search
+
+    # the parent owns the blocks and unlinks them when the batch is done
+    _worker_blocks = [shared_memory.SharedMemory(name=name) for name in shm_names]
+
+    size = (width + 2) * (height + 2)
+    _worker_grid = Grid(width, height, cells=_worker_blocks[0].buf[:size])
+    if len(_worker_blocks) > 1:
+        _worker_grid.costs = _worker_blocks[1].buf[:size]
+    _worker_search = ALGORITHMS[algorithm]
+
+def _solve_chunk(pairs:array) -> tuple[array, array]:
+    lengths = array("i")
+    indices = array("i")
+    for index in range(0, len(pairs), 2):
+        path = _worker_search(_worker_grid, pairs[index], pairs[index + 1])
+        lengths.append(len(path))
+        indices.extend(path)
+    return lengths, indices
@@ -0,0 +1,344 @@
+import os
+import random
+import sys
+import time
+
+from batch import solve_batch
+from landmarks import Landmarks
+from maps import load_map, load_movingai_scen
+from pathfinding import ALGORITHMS, ExpandEvent, Grid, Pathfinding
+from replanning import IncrementalPlanner
+
+def random_blacklist(arr_side:int, density:float, seed:int=0) -> list[int]:
+    rng = random.Random(seed)
+    blacklist = []
+    for rect in range(1, arr_side * arr_side + 1):
+        if rng.random() < density:
+            blacklist.append(rect)
+
+    # keep corners free for start and end rects
+    return [rect for rect in blacklist if rect not in (1, arr_side * arr_side)]
+
+def random_grid(width:int, height:int, density:float, seed:int=0) -> Grid:
+    rng = random.Random(seed)
+    grid = Grid(width, height)
+    for cell in range(1, width * height - 1):
+        if rng.random() < density:
+            grid.set_wall(cell)
+    return grid
+
+def open_grid(width:int, height:int, blocks:int=20, seed:int=0) -> Grid:
+    rng = random.Random(seed)
+    grid = Grid(width, height)
+
+    # a few large rectangular obstacles on an otherwise empty map
+    for _ in range(blocks):
+        block_width = rng.randint(1, max(1, width // 8))
+        block_height = rng.randint(1, max(1, height // 8))
+        left = rng.randrange(width - block_width + 1)
+        top = rng.randrange(height - block_height + 1)
+        for row in range(top, top + block_height):
+            for col in range(left, left + block_width):
+                grid.set_wall(row * width + col)
+    return grid
+
+def maze_grid(width:int, height:int, loops:float=0.05, seed:int=0) -> Grid:
+    rng = random.Random(seed)
+    grid = Grid(width, height)
+    for cell in range(width * height):
+        grid.set_wall(cell)
+
+    # carve a maze between cells on even coordinates with an iterative backtracker
+    grid.set_wall(0, False)
+    stack = [(0, 0)]
+    while stack:
+        x, y = stack[-1]
+        steps = [(dx, dy) for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                 if 0 <= x + dx < width and 0 <= y + dy < height and grid.is_wall((y + dy) * width + x + dx)]
+        if not steps:
+            stack.pop()
+            continue
+        dx, dy = rng.choice(steps)
+        grid.set_wall((y + dy // 2) * width + x + dx // 2, False)
+        grid.set_wall((y + dy) * width + x + dx, False)
+        stack.append((x + dx, y + dy))
+
+    # open some extra walls so there is more than one route
+    for cell in range(width * height):
+        if grid.is_wall(cell) and rng.random() < loops:
+            grid.set_wall(cell, False)
+    grid.set_wall(width * height - 1, False)
+    return grid
+
+def random_queries(grid:Grid, count:int, seed:int=0) -> list[tuple[int, int]]:
+    rng = random.Random(seed)
+    free = [cell for cell in range(grid.width * grid.height) if not grid.is_wall(cell)]
+    return [(rng.choice(free), rng.choice(free)) for _ in range(count)]
+
+def count_expanded(events) -> int:
+    return sum(1 for event in events if type(event) == ExpandEvent)
+
+def time_call(func, *args, **kwargs) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def bench_a_star(arr_side:int, density:float=0.2) -> None:
+    arr_size = arr_side * arr_side
+    blacklist = random_blacklist(arr_side, density)
+    elapsed, path = time_call(Pathfinding.search_a_star, 1, arr_size, arr_size, blacklist)
+    print(f"A* {arr_side}x{arr_side} density={density}: {elapsed * 1000:.1f} ms, path length {len(path)}")
+
+def bench_wavefront(side:int, density:float=0.2, targets:int=5) -> None:
+    from wavefront import Wavefront
+
+    grid = random_grid(side, side, density)
+    field_time, field = time_call(Wavefront.distance_field, grid, 0)
+    reachable = int((field >= 0).sum())
+
+    # one BFS per target, sampled and scaled to every reachable cell
+    rng = random.Random(0)
+    cells = [cell for cell in rng.sample(range(side * side), targets * 4) if field.flat[cell] >= 0][:targets]
+    bfs_time = sum(time_call(Pathfinding.breadth_first, grid, 0, cell)[0] for cell in cells) / len(cells)
+
+    print(f"wavefront {side}x{side}: field {field_time * 1000:.0f} ms, "
+          f"BFS per target {bfs_time * 1000:.0f} ms, "
+          f"{bfs_time / field_time:.1f}x faster for one target, "
+          f"{bfs_time * reachable / field_time:.0f}x for all {reachable} reachable cells")
+
+def bench_landmarks(side:int, count:int=8, queries:int=50) -> None:
+    for name, grid in (("random", random_grid(side, side, 0.3)), ("maze", maze_grid(side, side))):
+        build_time, landmarks = time_call(Landmarks.build, grid, count)
+        pairs = random_queries(grid, queries)
+
+        for label, make_heuristic in (("manhattan", lambda goal: None), (f"{count} landmarks", landmarks.heuristic_to)):
+            elapsed = expanded = 0
+            for start, goal in pairs:
+                heuristic = make_heuristic(goal)
+                elapsed += time_call(Pathfinding.a_star, grid, start, goal, heuristic)[0]
+                expanded += count_expanded(Pathfinding.iter_a_star(grid, start, goal, heuristic=heuristic))
+            print(f"A* {name} {side}x{side} {label}: {elapsed / queries * 1000:.1f} ms/query, "
+                  f"{expanded / queries:.0f} nodes expanded/query")
+        print(f"landmark build {name} {side}x{side}: {build_time * 1000:.0f} ms")
+
+def bench_jump_point(side:int, queries:int=20) -> None:
+    for name, grid in (("open", open_grid(side, side)), ("maze", maze_grid(side, side))):
+        pairs = random_queries(grid, queries)
+        for diagonal in (False, True):
+            results = {}
+            for label, search in (("A*", Pathfinding.a_star), ("JPS", Pathfinding.jump_point)):
+                elapsed = cost = 0
+                for start, goal in pairs:
+                    seconds, path = time_call(search, grid, start, goal, diagonal=diagonal)
+                    elapsed += seconds
+                    cost += Pathfinding.path_cost(grid, path)
+                results[label] = (elapsed, cost)
+
+            a_star_time, a_star_cost = results["A*"]
+            jump_time, jump_cost = results["JPS"]
+            moves = "8-way" if diagonal else "4-way"
+            print(f"JPS {name} {side}x{side} {moves}: A* {a_star_time / queries * 1000:.1f} ms/query, "
+                  f"JPS {jump_time / queries * 1000:.1f} ms/query ({a_star_time / jump_time:.1f}x), "
+                  f"same cost: {abs(a_star_cost - jump_cost) < 1e-6}")
+
+def terrain_grid(width:int, height:int, density:float=0.1, seed:int=0) -> Grid:
+    # random walls on patches of terrain that cost 1 to 9
+    rng = random.Random(seed)
+    grid = random_grid(width, height, density, seed)
+    patch = 8
+    for top in range(0, height, patch):
+        for left in range(0, width, patch):
+            cost = rng.choice((1, 1, 2, 3, 5, 9))
+            for row in range(top, min(top + patch, height)):
+                for col in range(left, min(left + patch, width)):
+                    grid.set_cost(row * width + col, cost)
+    return grid
+
+def bench_terrain(side:int, queries:int=20) -> None:
+    grid = terrain_grid(side, side)
+    pairs = random_queries(grid, queries)
+    results = {}
+    for label, search in (("Dijkstra", Pathfinding.iter_dijkstra), ("A*", Pathfinding.iter_a_star)):
+        elapsed = expanded = cost = 0
+        for start, goal in pairs:
+            seconds, path = time_call(Pathfinding.find_path, search(grid, start, goal, trace=False))
+            elapsed += seconds
+            expanded += count_expanded(search(grid, start, goal))
+            cost += Pathfinding.path_cost(grid, path)
+        results[label] = cost
+        print(f"terrain {side}x{side} {label}: {elapsed / queries * 1000:.1f} ms/query, {expanded / queries:.0f} nodes expanded/query")
+    print(f"terrain {side}x{side}: same cost: {abs(results['Dijkstra'] - results['A*']) < 1e-6}")
+
+def bench_bidirectional(side:int, queries:int=20) -> None:
+    for name, grid in (("random", random_grid(side, side, 0.25)), ("open", open_grid(side, side)), ("maze", maze_grid(side, side))):
+        pairs = random_queries(grid, queries)
+        for label, search, bidirectional in (("BFS", Pathfinding.iter_breadth_first, Pathfinding.iter_bidirectional_breadth_first),
+                                            ("A*", Pathfinding.iter_a_star, Pathfinding.iter_bidirectional_a_star)):
+            results = []
+            for iter_search in (search, bidirectional):
+                elapsed = expanded = 0
+                for start, goal in pairs:
+                    elapsed += time_call(Pathfinding.find_path, iter_search(grid, start, goal, trace=False))[0]
+                    expanded += count_expanded(iter_search(grid, start, goal))
+                results.append((elapsed, expanded))
+
+            (one_time, one_expanded), (two_time, two_expanded) = results
+            print(f"bidirectional {label} {name} {side}x{side}: {one_expanded / queries:.0f} -> {two_expanded / queries:.0f} nodes expanded/query "
+                  f"({two_expanded / max(one_expanded, 1):.2f}x), {one_time / queries * 1000:.1f} -> {two_time / queries * 1000:.1f} ms/query")
+
+def bench_hierarchical(side:int, queries:int=20, cluster_size:int=16) -> None:
+    from hierarchical import HierarchicalPlanner
+
+    for name, grid in (("random", random_grid(side, side, 0.25)), ("open", open_grid(side, side)), ("maze", maze_grid(side, side))):
+        build_time, planner = time_call(HierarchicalPlanner, grid, cluster_size)
+        pairs = [(start, goal) for start, goal in random_queries(grid, queries * 4) if Pathfinding.a_star(grid, start, goal)][:queries]
+
+        a_star_time = abstract_time = path_time = 0
+        worst = total = 0
+        for start, goal in pairs:
+            seconds, optimal = time_call(Pathfinding.a_star, grid, start, goal)
+            a_star_time += seconds
+            abstract_time += time_call(planner.abstract_path, start, goal)[0]
+            seconds, path = time_call(planner.find_path, start, goal)
+            path_time += seconds
+
+            ratio = Pathfinding.path_cost(grid, path) / max(Pathfinding.path_cost(grid, optimal), 1)
+            worst = max(worst, ratio)
+            total += ratio
+
+        # flip a few cells and rebuild only the clusters around them
+        rng = random.Random(0)
+        changed = [rng.randrange(side * side) for _ in range(5)]
+        for cell in changed:
+            grid.set_wall(cell, not grid.is_wall(cell))
+        update_time = time_call(planner.update_cells, changed)[0]
+
+        count = max(len(pairs), 1)
+        print(f"HPA* {name} {side}x{side} clusters of {cluster_size}: build {build_time * 1000:.0f} ms, "
+              f"A* {a_star_time / count * 1000:.1f} ms/query, abstract {abstract_time / count * 1000:.1f} ms/query, "
+              f"refined {path_time / count * 1000:.1f} ms/query, "
+              f"cost {(total / count - 1) * 100:.1f} % over optimal on average ({(worst - 1) * 100:.1f} % worst), "
+              f"5 edited cells {update_time * 1000:.1f} ms")
+
+def bench_replanning(side:int, changes:int=20, cells_per_change:int=3) -> None:
+    grid = random_grid(side, side, 0.15)
+    start, goal = 0, side * side - 1
+    planner = IncrementalPlanner(grid, goal)
+    first_time, _ = time_call(planner.find_path, start)
+
+    rng = random.Random(0)
+    replan_time = search_time = 0
+    for _ in range(changes):
+        changed = [rng.randrange(1, side * side - 1) for _ in range(cells_per_change)]
+        for cell in changed:
+            grid.set_wall(cell, not grid.is_wall(cell))
+        planner.update_cells(changed)
+        replan_time += time_call(planner.find_path, start)[0]
+        search_time += time_call(Pathfinding.a_star, grid, start, goal)[0]
+
+    print(f"replanning {side}x{side}: first plan {first_time * 1000:.0f} ms, "
+          f"replan after {cells_per_change} changed cells {replan_time / changes * 1000:.2f} ms, "
+          f"A* from scratch {search_time / changes * 1000:.1f} ms")
+
+def bench_batch(side:int, queries:int=2000) -> None:
+    grid = random_grid(side, side, 0.2)
+    pairs = random_queries(grid, queries)
+
+    serial_time = time_call(lambda: [Pathfinding.a_star(grid, start, goal) for start, goal in pairs])[0]
+    print(f"batch {side}x{side}: serial {queries / serial_time:.0f} queries/s on {os.cpu_count()} cores")
+    for workers in (1, 2, 4, 8):
+        elapsed = time_call(solve_batch, grid, pairs, "A*", workers)[0]
+        print(f"batch {side}x{side}: {workers} workers {queries / elapsed:.0f} queries/s ({serial_time / elapsed:.2f}x serial)")
+
+def run_agents(planner, max_ticks:int) -> tuple[float, int, int]:
+    # steps the planner until every agent arrived or max_ticks ran out, checking every tick
+    # that no two agents share a cell or swap cells. returns planning seconds, moves and collisions
+    previous = planner.cells()
+    moves = 0
+    collisions = 0
+    plan_time = 0
+    while not planner.done() and planner.tick < max_ticks:
+        seconds, current = time_call(planner.step)
+        plan_time += seconds
+        occupied = {}
+        for agent, cell in enumerate(current):
+            if cell is None:
+                continue
+            if cell in occupied:
+                collisions += 1
+            occupied[cell] = agent
+            if cell != previous[agent]:
+                moves += 1
+                other = occupied.get(previous[agent])
+                if other is not None and previous[other] == cell:
+                    collisions += 1
+        previous = current
+    return plan_time, moves, collisions
+
+def place_agents(planner, grid:Grid, count:int, seed:int) -> None:
+    # random distinct starts and goals, pairs that cannot reach each other are left out
+    free = [cell for cell in range(grid.width * grid.height) if not grid.is_wall(cell)]
+    rng = random.Random(seed)
+    for start, goal in zip(rng.sample(free, count), rng.sample(free, count)):
+        try:
+            planner.add_agent(start, goal)
+        except ValueError:
+            pass
+
+def bench_cooperative(side:int, counts:tuple[int, ...]=(100, 250, 500, 1000), max_ticks:int=2000) -> bool:
+    from cooperative import CooperativePlanner
+
+    grid = random_grid(side, side, 0.1)
+    collisions = 0
+    for count in counts:
+        planner = CooperativePlanner(grid)
+        place_agents(planner, grid, count, seed=count)
+        plan_time, moves, count_collisions = run_agents(planner, max_ticks)
+        collisions += count_collisions
+
+        arrived = sum(planner.arrived)
+        print(f"cooperative {side}x{side} {len(planner.positions)} agents: {planner.tick} ticks, {arrived} arrived, "
+              f"{planner.tick / plan_time:.0f} ticks/s, {moves / plan_time:.0f} moves/s, {count_collisions} collisions")
+    return collisions == 0
+
+def check_scenarios(map_path:str, scen_path:str, algorithm:str="JPS 8-way") -> bool:
+    # compare path costs with the optimal lengths published with Moving AI benchmark maps
+    grid = load_map(map_path)
+    search = ALGORITHMS[algorithm]
+    failures = 0
+    scenarios = load_movingai_scen(scen_path)
+    elapsed = 0
+    for scenario in scenarios:
+        seconds, path = time_call(search, grid, scenario.start_y * grid.width + scenario.start_x, scenario.goal_y * grid.width + scenario.goal_x)
+        elapsed += seconds
+        cost = Pathfinding.path_cost(grid, path)
+        if abs(cost - scenario.optimal_length) > 1e-4:
+            failures += 1
+            print(f"{algorithm} ({scenario.start_x}, {scenario.start_y}) -> ({scenario.goal_x}, {scenario.goal_y}): "
+                  f"cost {cost:.5f}, optimal {scenario.optimal_length:.5f}")
+
+    print(f"{algorithm} on {scen_path}: {len(scenarios) - failures}/{len(scenarios)} optimal, {elapsed * 1000:.0f} ms")
+    return failures == 0
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[2].endswith(".scen"):
+        sys.exit(0 if check_scenarios(sys.argv[1], sys.argv[2]) else 1)
+
+    sides = [int(arg) for arg in sys.argv[1:]] or [100, 1000]
+    collision_free = True
+    for side in sides:
+        bench_a_star(side)
+        bench_wavefront(side)
+        bench_landmarks(side)
+        bench_jump_point(side)
+        bench_bidirectional(side)
+        bench_hierarchical(side)
+        bench_terrain(side)
+        collision_free = bench_cooperative(min(side, 128)) and collision_free
+        bench_replanning(side)
+        bench_batch(side)
+
+    # agents running into each other is a wrong result, not a slow one
+    if not collision_free:
+        print("cooperative agents collided", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,202 @@
+from array import array
+from heapq import heappop, heappush
+
+from pathfinding import Grid
+
+class CooperativePlanner:
+    def __init__(self, grid:Grid, window:int=16, replan_interval:int=None, park_at_goal:bool=True) -> None:
+        # windowed hierarchical cooperative A*: agents plan window steps ahead in space-time,
+        # avoid the cells other agents reserved and replan every replan_interval ticks
+        self.grid = grid
+        self.window = window
+        self.replan_interval = replan_interval or max(window // 2, 1)
+        self.park_at_goal = park_at_goal
+
+        # (cell, t) is hashed as t * len(grid.cells) + padded node -> agent
+        self.reservations = {}
+
+        # goal node -> exact distances back from the goal, shared by every agent heading there
+        self.heuristics = {}
+        self.heuristics_version = grid.version
+
+        self.positions = [] # padded node of every agent, None once it left the map
+        self.goals = []
+        self.arrived = []
+        self.plans = []
+        self.order = [] # planning priority, agents that got stuck go first next round
+        self.tick = 0
+        self.round_start = 0
+        self.next_replan = 0
+
+    def add_agent(self, start:int, goal:int) -> int:
+        start_node = self.grid.node(start)
+        goal_node = self.grid.node(goal)
+        if self.grid.cells[start_node] or self.grid.cells[goal_node]:
+            raise ValueError("agents cannot start or end in a wall")
+        if start_node in self.positions:
+            raise ValueError(f"another agent already starts at {start}")
+        if self._goal_distances(goal_node)[start_node] == -1:
+            raise ValueError(f"goal {goal} cannot be reached from {start}")
+
+        agent = len(self.positions)
+        self.positions.append(start_node)
+        self.goals.append(goal_node)
+        self.arrived.append(start_node == goal_node)
+        self.plans.append([start_node])
+        self.order.append(agent)
+
+        # the new agent is planned on the next tick
+        self.next_replan = self.tick
+        return agent
+
+    def cells(self) -> list[int]:
+        # current cell of every agent, None for agents that left the map
+        return [None if node is None else self.grid.cell(node) for node in self.positions]
+
+    def done(self) -> bool:
+        return all(self.arrived)
+
+    def step(self) -> list[int]:
+        if self.tick >= self.next_replan:
+            self._plan_round()
+
+        offset = self.tick - self.round_start + 1
+        for agent, plan in enumerate(self.plans):
+            node = self.positions[agent]
+            if node is None:
+                continue
+            node = plan[min(offset, len(plan) - 1)]
+            self.positions[agent] = node
+            if node == self.goals[agent] and not self.arrived[agent]:
+                self.arrived[agent] = True
+                if not self.park_at_goal:
+                    self.positions[agent] = None
+
+        self.tick += 1
+        return self.cells()
+
+    def run(self, max_ticks:int=10000) -> int:
+        # ticks until every agent arrived, -1 if that took more than max_ticks
+        while not self.done():
+            if self.tick >= max_ticks:
+                return -1
+            self.step()
+        return self.tick
+
+    def _plan_round(self) -> None:
+        size = len(self.grid.cells)
+        now = self.tick * size
+        following = now + size
+        self.reservations.clear()
+
+        # everyone keeps the cell it stands on for the next tick, so waiting is always possible
+        active = [agent for agent in self.order if self.positions[agent] is not None]
+        for agent in active:
+            node = self.positions[agent]
+            self.reservations[now + node] = agent
+            self.reservations[following + node] = agent
+
+        # agents still on their way plan before the parked ones
+        failed = []
+        for agent in sorted(active, key=self.arrived.__getitem__):
+            plan = self._plan(agent)
+            if plan is None:
+                # stuck agents wait, the whole round is replanned on the next tick
+                failed.append(agent)
+                plan = [self.positions[agent]] * (self.window + 1)
+            else:
+                for time, node in enumerate(plan[1:], self.tick + 1):
+                    self.reservations[time * size + node] = agent
+            self.plans[agent] = plan
+
+        stuck = set(failed)
+        self.order = failed + [agent for agent in self.order if agent not in stuck]
+        self.round_start = self.tick
+        self.next_replan = self.tick + (1 if failed else self.replan_interval)
+
+    def _plan(self, agent:int) -> list[int]:
+        # space-time A* to the end of the window, every tick costs 1 except waiting on the goal.
+        # beyond the window the exact goal distance takes over as the heuristic
+        cells = self.grid.cells
+        size = len(cells)
+        reservations = self.reservations
+        goal_node = self.goals[agent]
+        dist = self._goal_distances(goal_node)
+        start = self.positions[agent]
+        horizon = self.tick + self.window
+        moves = (0,) + self.grid.offsets
+
+        start_key = self.tick * size + start
+        best_g = {start_key: 0}
+        parents = {start_key: start_key}
+        closed = set()
+
+        # open list holds (f, -time, node, time), later times first on ties
+        open_list = [(dist[start], -self.tick, start, self.tick)]
+        while open_list:
+            _, _, node, time = heappop(open_list)
+            key = time * size + node
+            if key in closed:
+                continue
+            closed.add(key)
+
+            if time == horizon:
+                plan = []
+                while key != start_key:
+                    plan.append(key % size)
+                    key = parents[key]
+                plan.append(start)
+                return plan[::-1]
+
+            node_g = best_g[key]
+            for offset in moves:
+                child = node + offset
+                if cells[child] or dist[child] == -1:
+                    continue
+                child_key = key + size + offset
+                if child_key in closed:
+                    continue
+
+                # the cell must be free at the next tick, and no agent may come the other way
+                owner = reservations.get(child_key)
+                if owner is not None and owner != agent:
+                    continue
+                if offset:
+                    owner = reservations.get(key + offset)
+                    if owner is not None and owner != agent and reservations.get(child_key - offset) == owner:
+                        continue
+
+                child_g = node_g + (0 if child == node == goal_node else 1)
+                if child_g >= best_g.get(child_key, child_g + 1):
+                    continue
+                best_g[child_key] = child_g
+                parents[child_key] = key
+                heappush(open_list, (child_g + dist[child], -time - 1, child, time + 1))
+
+        return None
+
+    def _goal_distances(self, goal_node:int) -> array:
+        # reverse breadth first search from the goal, -1 for cells that cannot reach it
+        if self.heuristics_version != self.grid.version:
+            self.heuristics.clear()
+            self.heuristics_version = self.grid.version
+        if goal_node in self.heuristics:
+            return self.heuristics[goal_node]
+
+        cells = self.grid.cells
+        dist = array("i", [-1]) * len(cells)
+        dist[goal_node] = 0
+        layer = [goal_node]
+        while layer:
+            next_layer = []
+            for node in layer:
+                child_dist = dist[node] + 1
+                for offset in self.grid.offsets:
+                    child = node + offset
+                    if not cells[child] and dist[child] == -1:
+                        dist[child] = child_dist
+                        next_layer.append(child)
+            layer = next_layer
+
+        self.heuristics[goal_node] = dist
+        return dist
@@ -0,0 +1,115 @@
+import argparse
+import csv
+import json
+import sys
+import time
+
+from maps import load_map, load_movingai_scen
+from pathfinding import ALGORITHMS, Grid, Pathfinding, SearchStats
+
+def algorithm_names() -> dict[str, str]:
+    # shell friendly names: "A*" -> "astar", "JPS 8-way" -> "jps8way"
+    return {name.lower().replace("*", "star").replace(" ", "").replace("-", ""): name for name in ALGORITHMS}
+
+def read_queries(path:str) -> list[tuple[int, int, int, int]]:
+    # one query per line: start_x start_y goal_x goal_y, separated by spaces or commas
+    queries = []
+    with open(path) as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.split("#", 1)[0].replace(",", " ").strip()
+            if not line:
+                continue
+            values = line.split()
+            if len(values) != 4:
+                raise ValueError(f"{path}:{line_number}: expected start_x start_y goal_x goal_y")
+            queries.append(tuple(int(value) for value in values))
+    return queries
+
+def read_scenarios(path:str) -> tuple[list[tuple[int, int, int, int]], list[float]]:
+    scenarios = load_movingai_scen(path)
+    queries = [(scenario.start_x, scenario.start_y, scenario.goal_x, scenario.goal_y) for scenario in scenarios]
+    return queries, [scenario.optimal_length for scenario in scenarios]
+
+def solve(grid:Grid, queries:list[tuple[int, int, int, int]], algorithm:str, with_stats:bool=False):
+    search = ALGORITHMS[algorithm]
+    for index, (start_x, start_y, goal_x, goal_y) in enumerate(queries):
+        for x, y in ((start_x, start_y), (goal_x, goal_y)):
+            if not (0 <= x < grid.width and 0 <= y < grid.height):
+                raise ValueError(f"query {index}: ({x}, {y}) is outside the {grid.width}x{grid.height} map")
+
+        stats = SearchStats() if with_stats else None
+        start_time = time.perf_counter()
+        path = search(grid, start_y * grid.width + start_x, goal_y * grid.width + goal_x, stats=stats)
+        elapsed = time.perf_counter() - start_time
+
+        result = {
+            "query": index,
+            "start": [start_x, start_y],
+            "goal": [goal_x, goal_y],
+            "found": bool(path),
+            "length": max(len(path) - 1, 0),
+            "cost": round(Pathfinding.path_cost(grid, path), 6),
+            "time_ms": round(elapsed * 1000, 3),
+            "path": [[cell % grid.width, cell // grid.width] for cell in path],
+        }
+        if stats is not None:
+            result.update(expanded=stats.expanded, peak_open=stats.peak_open, pushes=stats.pushes, pops=stats.pops)
+        yield result
+
+def main(argv:list[str]=None) -> int:
+    names = algorithm_names()
+    parser = argparse.ArgumentParser(prog="python -m pathfinding", description="Solve path queries on a map without the GUI.")
+    parser.add_argument("map", help="text map ('.' free, '@' wall), Moving AI .map or binary .grid file")
+    parser.add_argument("queries", help="Moving AI .scen file or one 'start_x start_y goal_x goal_y' per line")
+    parser.add_argument("-a", "--algorithm", default="astar", choices=sorted(names))
+    parser.add_argument("-f", "--format", default="jsonl", choices=["jsonl", "csv"])
+    parser.add_argument("--no-path", action="store_true", help="leave the cell list out of the output")
+    parser.add_argument("--stats", action="store_true", help="add expanded nodes, peak open list size and open list pushes and pops")
+    args = parser.parse_args(argv)
+
+    optimal = None
+    try:
+        grid = load_map(args.map)
+        if args.queries.endswith(".scen"):
+            queries, optimal = read_scenarios(args.queries)
+        else:
+            queries = read_queries(args.queries)
+    except (OSError, ValueError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 2
+
+    fields = ["query", "start", "goal", "found", "length", "cost", "time_ms"]
+    if optimal is not None:
+        fields.append("optimal")
+    if args.stats:
+        fields.extend(["expanded", "peak_open", "pushes", "pops"])
+    if not args.no_path:
+        fields.append("path")
+
+    writer = None
+    if args.format == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(fields)
+
+    try:
+        for result in solve(grid, queries, names[args.algorithm], args.stats):
+            if optimal is not None:
+                result["optimal"] = optimal[result["query"]]
+
+            # results are streamed as soon as each query is solved
+            if writer is None:
+                print(json.dumps({field: result[field] for field in fields}), flush=True)
+            else:
+                row = [result[field] for field in fields]
+                row[1:3] = [" ".join(map(str, point)) for point in row[1:3]]
+                if not args.no_path:
+                    row[-1] = ";".join(f"{x} {y}" for x, y in result["path"])
+                writer.writerow(row)
+                sys.stdout.flush()
+    except ValueError as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        pass
+
+    return 0
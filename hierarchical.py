@@ -0,0 +1,310 @@
+from heapq import heappop, heappush
+from typing import Iterator
+
+from pathfinding import Grid, PathEvent, Pathfinding, SearchEvent, SearchStats
+
+class HierarchicalPlanner:
+    def __init__(self, grid:Grid, cluster_size:int=16, entrance_spacing:int=8, diagonal:bool=False) -> None:
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.entrance_spacing = max(entrance_spacing, 1)
+        self.diagonal = diagonal
+        self.cluster_cols = -(-grid.width // cluster_size)
+        self.cluster_rows = -(-grid.height // cluster_size)
+
+        # a path is at most max_detour longer than the best path for every cluster border the best path crosses:
+        # it walks along the border to the nearest transition and back. entrance_spacing=1 on a 4-way grid is exact.
+        self.max_detour = 2 * (self.entrance_spacing // 2) + (2 - Grid.DIAGONAL_COST if diagonal else 0)
+
+        # (cluster, neighbour cluster) -> [(cell, neighbour cell)] pairs of free cells across the border
+        self.transitions = {}
+        # entrance cell -> entrance cells across a border, one step away
+        self.links = {}
+        # cluster -> {entrance cell: [(entrance cell, cost inside the cluster)]}
+        self.edges = {}
+        # cluster -> copy of its cells as a small Grid, made on demand
+        self.subgrids = {}
+
+        for cluster in range(self.cluster_cols * self.cluster_rows):
+            for border in self._borders(cluster):
+                if border[0] == cluster:
+                    self._build_border(*border)
+        for cluster in range(self.cluster_cols * self.cluster_rows):
+            self._build_edges(cluster)
+
+    def update_cells(self, cells:list[int]) -> None:
+        # the grid already holds the new walls, only clusters around the changed cells are rebuilt
+        borders = set()
+        clusters = set()
+        for cell in cells:
+            cluster = self._cluster_of(cell)
+            clusters.add(cluster)
+
+            # a cell on the edge of its cluster can change the transitions of that border
+            y, x = divmod(cell, self.grid.width)
+            x0, y0, x1, y1 = self._bounds(cluster)
+            for border in self._borders(cluster):
+                neighbour = border[0] if border[1] == cluster else border[1]
+                nx0, ny0, nx1, ny1 = self._bounds(neighbour)
+                if (nx1 == x0 and x == x0) or (nx0 == x1 and x == x1 - 1) or (ny1 == y0 and y == y0) or (ny0 == y1 and y == y1 - 1):
+                    borders.add(border)
+
+        for border in borders:
+            self._build_border(*border)
+            clusters.update(border)
+        for cluster in clusters:
+            self.subgrids.pop(cluster, None)
+            self._build_edges(cluster)
+
+    def abstract_path(self, start:int, goal:int, stats:SearchStats=None) -> list[int]:
+        # start, the entrance cells the path goes through, goal. cheap enough to pick a first move from
+        if self.grid.is_wall(start) or self.grid.is_wall(goal):
+            return []
+        if start == goal:
+            return [start]
+
+        width = self.grid.width
+        start_cluster = self._cluster_of(start)
+        goal_cluster = self._cluster_of(goal)
+
+        # start and goal join the abstract graph through the entrances of their clusters
+        start_dist = self._distances(start_cluster, start)
+        start_edges = self._entrance_costs(start_cluster, start_dist)
+        if start_cluster == goal_cluster:
+            direct = start_dist[self._subgrid(start_cluster).node(self._local(start_cluster, goal))]
+            if direct != -1:
+                start_edges[goal] = direct
+        goal_edges = self._entrance_costs(goal_cluster, self._distances(goal_cluster, goal))
+
+        goal_rowcol = divmod(goal, width)
+        start_h = Pathfinding._distance(divmod(start, width), goal_rowcol, self.diagonal)
+        open_list = [(start_h, start_h, start)]
+        best_g = {start: 0}
+        parents = {start: start}
+        closed = set()
+
+        while open_list:
+            _, _, node = heappop(open_list)
+            if stats is not None:
+                stats.pops += 1
+            if node in closed:
+                continue
+            closed.add(node)
+            if stats is not None:
+                stats.expand(node, len(open_list))
+
+            if node == goal:
+                path = [node]
+                while node != start:
+                    node = parents[node]
+                    path.append(node)
+                return path[::-1]
+
+            neighbours = list(self.edges[self._cluster_of(node)].get(node, ()))
+            neighbours.extend((cell, 1) for cell in self.links.get(node, ()))
+            if node == start:
+                neighbours.extend(start_edges.items())
+            if node in goal_edges:
+                neighbours.append((goal, goal_edges[node]))
+
+            node_g = best_g[node]
+            for child, cost in neighbours:
+                if child in closed:
+                    continue
+                child_g = node_g + cost
+                if child in best_g and best_g[child] <= child_g:
+                    continue
+                best_g[child] = child_g
+                parents[child] = node
+
+                child_h = Pathfinding._distance(divmod(child, width), goal_rowcol, self.diagonal)
+                heappush(open_list, (child_g + child_h, child_h, child))
+                if stats is not None:
+                    stats.pushes += 1
+
+        return []
+
+    def refine(self, abstract_path:list[int], stats:SearchStats=None) -> Iterator[list[int]]:
+        # cell by cell segments between consecutive abstract cells, searched only when asked for
+        for cell, next_cell in zip(abstract_path, abstract_path[1:]):
+            if next_cell in self.links.get(cell, ()):
+                yield [cell, next_cell]
+                continue
+
+            cluster = self._cluster_of(cell)
+            subgrid = self._subgrid(cluster)
+            local_search = Pathfinding.iter_a_star(subgrid, self._local(cluster, cell), self._local(cluster, next_cell), trace=False, diagonal=self.diagonal, stats=stats)
+            local_path = Pathfinding.find_path(local_search)
+            yield [self._global(cluster, local_cell) for local_cell in local_path]
+
+    def iter_find_path(self, start:int, goal:int, stats:SearchStats=None) -> Iterator[SearchEvent]:
+        # abstract nodes and the cells of the local searches are counted in the same stats
+        abstract = self.abstract_path(start, goal, stats)
+        path = abstract[:1]
+        for segment in self.refine(abstract, stats):
+            path.extend(segment[1:])
+        yield PathEvent(path=path)
+
+    def find_path(self, start:int, goal:int, stats:SearchStats=None) -> list[int]:
+        return Pathfinding.find_path(self.iter_find_path(start, goal, stats), stats)
+
+    def _cluster_of(self, cell:int) -> int:
+        y, x = divmod(cell, self.grid.width)
+        return (y // self.cluster_size) * self.cluster_cols + x // self.cluster_size
+
+    def _bounds(self, cluster:int) -> tuple[int, int, int, int]:
+        # x0, y0, x1, y1 with the end excluded
+        cy, cx = divmod(cluster, self.cluster_cols)
+        x0 = cx * self.cluster_size
+        y0 = cy * self.cluster_size
+        return x0, y0, min(x0 + self.cluster_size, self.grid.width), min(y0 + self.cluster_size, self.grid.height)
+
+    def _borders(self, cluster:int) -> list[tuple[int, int]]:
+        # (lower id, higher id) for every side that has a neighbour cluster
+        cy, cx = divmod(cluster, self.cluster_cols)
+        borders = []
+        if cx + 1 < self.cluster_cols:
+            borders.append((cluster, cluster + 1))
+        if cy + 1 < self.cluster_rows:
+            borders.append((cluster, cluster + self.cluster_cols))
+        if cx > 0:
+            borders.append((cluster - 1, cluster))
+        if cy > 0:
+            borders.append((cluster - self.cluster_cols, cluster))
+        return borders
+
+    def _build_border(self, cluster:int, neighbour:int) -> None:
+        for cell, other in self.transitions.pop((cluster, neighbour), []):
+            self._unlink(cell, other)
+            self._unlink(other, cell)
+
+        # the neighbour is to the right or below, walk the pairs of cells facing each other
+        width = self.grid.width
+        x0, y0, x1, y1 = self._bounds(cluster)
+        if neighbour == cluster + 1 and x1 < self.grid.width:
+            pairs = [(y * width + x1 - 1, y * width + x1) for y in range(y0, y1)]
+        else:
+            pairs = [(y1 * width - width + x, y1 * width + x) for x in range(x0, x1)]
+
+        # runs of open pairs get a transition in the middle, long runs one every entrance_spacing cells
+        transitions = []
+        run = []
+        for pair in pairs + [None]:
+            if pair is not None and not self.grid.is_wall(pair[0]) and not self.grid.is_wall(pair[1]):
+                run.append(pair)
+                continue
+            if len(run) > self.entrance_spacing:
+                picked = run[::self.entrance_spacing]
+                if picked[-1] != run[-1]:
+                    picked.append(run[-1])
+                transitions.extend(picked)
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+
+        self.transitions[(cluster, neighbour)] = transitions
+        for cell, other in transitions:
+            self.links.setdefault(cell, []).append(other)
+            self.links.setdefault(other, []).append(cell)
+
+    def _unlink(self, cell:int, other:int) -> None:
+        linked = self.links[cell]
+        linked.remove(other)
+        if not linked:
+            del self.links[cell]
+
+    def _entrances(self, cluster:int) -> list[int]:
+        entrances = set()
+        for border in self._borders(cluster):
+            side = 0 if border[0] == cluster else 1
+            entrances.update(pair[side] for pair in self.transitions.get(border, ()))
+        return sorted(entrances)
+
+    def _build_edges(self, cluster:int) -> None:
+        # costs between every pair of entrances that can reach each other without leaving the cluster
+        entrances = self._entrances(cluster)
+        edges = {cell: [] for cell in entrances}
+        subgrid = self._subgrid(cluster)
+        for index, cell in enumerate(entrances[:-1]):
+            dist = self._distances(cluster, cell)
+            for other in entrances[index + 1:]:
+                cost = dist[subgrid.node(self._local(cluster, other))]
+                if cost != -1:
+                    edges[cell].append((other, cost))
+                    edges[other].append((cell, cost))
+        self.edges[cluster] = edges
+
+    def _entrance_costs(self, cluster:int, dist:list[float]) -> dict[int, float]:
+        subgrid = self._subgrid(cluster)
+        costs = {}
+        for cell in self.edges[cluster]:
+            cost = dist[subgrid.node(self._local(cluster, cell))]
+            if cost != -1:
+                costs[cell] = cost
+        return costs
+
+    def _subgrid(self, cluster:int) -> Grid:
+        if cluster in self.subgrids:
+            return self.subgrids[cluster]
+
+        x0, y0, x1, y1 = self._bounds(cluster)
+        subgrid = Grid(x1 - x0, y1 - y0)
+        for y in range(y0, y1):
+            node = self.grid.node(y * self.grid.width + x0)
+            local_node = subgrid.node((y - y0) * subgrid.width)
+            subgrid.cells[local_node:local_node + subgrid.width] = self.grid.cells[node:node + subgrid.width]
+        self.subgrids[cluster] = subgrid
+        return subgrid
+
+    def _local(self, cluster:int, cell:int) -> int:
+        x0, y0, x1, _ = self._bounds(cluster)
+        y, x = divmod(cell, self.grid.width)
+        return (y - y0) * (x1 - x0) + x - x0
+
+    def _global(self, cluster:int, local_cell:int) -> int:
+        x0, y0, x1, _ = self._bounds(cluster)
+        y, x = divmod(local_cell, x1 - x0)
+        return (y + y0) * self.grid.width + x + x0
+
+    def _distances(self, cluster:int, cell:int) -> list[float]:
+        # distances inside the cluster from one cell, by padded node of the subgrid, -1 for unreachable
+        subgrid = self._subgrid(cluster)
+        cells = subgrid.cells
+        source = subgrid.node(self._local(cluster, cell))
+        dist = [-1] * len(cells)
+        dist[source] = 0
+
+        # unit costs, a breadth first sweep is enough
+        if not self.diagonal:
+            layer = [source]
+            while layer:
+                next_layer = []
+                for node in layer:
+                    child_dist = dist[node] + 1
+                    for offset in subgrid.offsets:
+                        child = node + offset
+                        if not cells[child] and dist[child] == -1:
+                            dist[child] = child_dist
+                            next_layer.append(child)
+                layer = next_layer
+            return dist
+
+        closed = bytearray(len(cells))
+        moves = subgrid.moves + subgrid.diagonal_moves
+        open_list = [(0, source)]
+        while open_list:
+            node_dist, node = heappop(open_list)
+            if closed[node]:
+                continue
+            closed[node] = 1
+            for offset, cost, corner_a, corner_b in moves:
+                child = node + offset
+                if cells[child] or closed[child]:
+                    continue
+                if corner_a and (cells[node + corner_a] or cells[node + corner_b]):
+                    continue
+                child_dist = node_dist + cost
+                if dist[child] == -1 or child_dist < dist[child]:
+                    dist[child] = child_dist
+                    heappush(open_list, (child_dist, child))
+        return dist
@@ -0,0 +1,169 @@
+import random
+import struct
+import sys
+from array import array
+from heapq import heappop, heappush
+from typing import Callable
+
+from pathfinding import Grid, Queue
+
+class Landmarks:
+    MAGIC = b"PFLM"
+    HEADER = struct.Struct("<4sIIII") # magic, width, height, landmark count, bytes per distance (8 for 8-way doubles)
+
+    def __init__(self, width:int, height:int, nodes:list[int], tables:list[array], diagonal:bool=False) -> None:
+        self.width = width
+        self.height = height
+        self.stride = width + 2
+        self.nodes = nodes
+        self.tables = tables
+
+        # 8-way tables hold octile distances as doubles, 4-way tables step counts
+        self.diagonal = diagonal
+
+        # largest value of the table type marks cells the landmark cannot reach
+        if diagonal:
+            self.unreachable = float("inf")
+        else:
+            self.unreachable = (1 << (8 * tables[0].itemsize)) - 1 if tables else 0
+
+    @classmethod
+    def build(cls, grid:Grid, count:int=8, seed:int=0, diagonal:bool=False) -> "Landmarks":
+        # diagonal tables are for 8-way A*, 4-way ones overestimate diagonal moves
+        free = [node for node, cell in enumerate(grid.cells) if cell == Grid.FREE]
+        if not free or count <= 0:
+            return cls(grid.width, grid.height, [], [], diagonal)
+
+        # farthest point selection: each landmark is the cell farthest from the ones picked so far
+        measure = Landmarks._diagonal_distances if diagonal else Landmarks._distances
+        distances = measure(grid, random.Random(seed).choice(free))
+        nodes = []
+        tables = []
+        closest = None
+        for _ in range(count):
+            if closest is None:
+                node = max(free, key=distances.__getitem__)
+            else:
+                node = max(free, key=closest.__getitem__)
+                if closest[node] <= 0:
+                    break
+            distances = measure(grid, node)
+            nodes.append(node)
+            tables.append(distances)
+            closest = distances if closest is None else array(distances.typecode, map(min, closest, distances))
+
+        if diagonal:
+            return cls(grid.width, grid.height, nodes, [array("d", (float("inf") if dist < 0 else dist for dist in table)) for table in tables], True)
+
+        # store the tables in the smallest type that fits the longest distance
+        longest = max(max(table) for table in tables)
+        typecode = "H" if longest < 0xFFFF else "I"
+        unreachable = 0xFFFF if typecode == "H" else 0xFFFFFFFF
+        tables = [array(typecode, (unreachable if dist < 0 else dist for dist in table)) for table in tables]
+        return cls(grid.width, grid.height, nodes, tables)
+
+    @staticmethod
+    def _distances(grid:Grid, source:int) -> array:
+        # breadth first search from a padded node, -1 for unreachable cells
+        cells = grid.cells
+        distances = array("i", [-1]) * len(cells)
+        distances[source] = 0
+        arr = Queue([source])
+        while arr.is_empty() == False:
+            node = arr.pop()
+            child_dist = distances[node] + 1
+            for offset in grid.offsets:
+                child = node + offset
+                if not cells[child] and distances[child] == -1:
+                    distances[child] = child_dist
+                    arr.add(child)
+        return distances
+
+    @staticmethod
+    def _diagonal_distances(grid:Grid, source:int) -> array:
+        # uniform cost search over the 8-way moves of iter_a_star, -1 for unreachable cells.
+        # moves that cannot cut corners are the same both ways, so these are distances to the source too
+        cells = grid.cells
+        moves = grid.moves + grid.diagonal_moves
+        distances = array("d", [-1.0]) * len(cells)
+        distances[source] = 0.0
+        open_list = [(0.0, source)]
+        while open_list:
+            node_dist, node = heappop(open_list)
+            if node_dist > distances[node]:
+                continue
+            for offset, cost, corner_a, corner_b in moves:
+                child = node + offset
+                if cells[child] or (corner_a and (cells[node + corner_a] or cells[node + corner_b])):
+                    continue
+                child_dist = node_dist + cost
+                if distances[child] < 0 or child_dist < distances[child]:
+                    distances[child] = child_dist
+                    heappush(open_list, (child_dist, child))
+        return distances
+
+    def heuristic_to(self, goal:int) -> Callable[[int], float]:
+        stride = self.stride
+        goal_node = (goal // self.width + 1) * stride + goal % self.width + 1
+        goal_row, goal_col = divmod(goal_node, stride)
+        pairs = [(table, table[goal_node]) for table in self.tables if table[goal_node] != self.unreachable]
+        diagonal = self.diagonal
+
+        # triangle inequality: d(n, goal) >= |d(l, goal) - d(l, n)| for every landmark l,
+        # never below the manhattan or octile distance of the moves the tables were built for
+        def heuristic(node:int) -> float:
+            row, col = divmod(node, stride)
+            rows, cols = abs(row - goal_row), abs(col - goal_col)
+            if diagonal:
+                result = max(rows, cols) + (Grid.DIAGONAL_COST - 1) * min(rows, cols)
+            else:
+                result = rows + cols
+            for table, goal_dist in pairs:
+                dist = table[node] - goal_dist
+                if dist < 0:
+                    dist = -dist
+                if dist > result:
+                    result = dist
+            return result
+
+        # iter_a_star only takes a custom heuristic for 8-way moves when it says it was made for them
+        heuristic.diagonal = diagonal
+        return heuristic
+
+    def save(self, path:str) -> None:
+        itemsize = self.tables[0].itemsize if self.tables else (8 if self.diagonal else 2)
+        with open(path, "wb") as file:
+            file.write(Landmarks.HEADER.pack(Landmarks.MAGIC, self.width, self.height, len(self.nodes), itemsize))
+            file.write(Landmarks._little_endian(array("I", self.nodes)))
+            for table in self.tables:
+                file.write(Landmarks._little_endian(table))
+
+    @classmethod
+    def load(cls, path:str) -> "Landmarks":
+        with open(path, "rb") as file:
+            magic, width, height, count, itemsize = Landmarks.HEADER.unpack(file.read(Landmarks.HEADER.size))
+            if magic != Landmarks.MAGIC:
+                raise ValueError(f"{path} is not a landmark file")
+
+            nodes = Landmarks._read(file, "I", count)
+            typecode = {2: "H", 4: "I", 8: "d"}.get(itemsize)
+            if typecode is None:
+                raise ValueError(f"{path} has unsupported distances of {itemsize} bytes")
+            tables = [Landmarks._read(file, typecode, (width + 2) * (height + 2)) for _ in range(count)]
+
+        return cls(width, height, list(nodes), tables, typecode == "d")
+
+    @staticmethod
+    def _little_endian(arr:array) -> bytes:
+        if sys.byteorder == "big":
+            arr = array(arr.typecode, arr)
+            arr.byteswap()
+        return arr.tobytes()
+
+    @staticmethod
+    def _read(file, typecode:str, count:int) -> array:
+        arr = array(typecode)
+        arr.fromfile(file, count)
+        if sys.byteorder == "big":
+            arr.byteswap()
+        return arr
@@ -1,13 +1,21 @@
+import argparse
 import time
 import tkinter as tk
-from math import sqrt
+from collections import deque
 from tkinter import messagebox, ttk
 
-from pathfinding import Pathfinding
+from background import SearchRunner
+from model import GridModel
+from pathfinding import Grid, Pathfinding, ExpandEvent, PathEvent, SearchEvent, SearchStats
+from replanning import IncrementalPlanner
+from renderers import RasterRenderer, RectangleRenderer
 from event_handlers import InputHandler, GameEvent, MouseEvent, InputEvent
 
 class Game(tk.Tk):
-    def __init__(self, window_width:int=960, window_height:int=720) -> None:
+    # rectangles are fine for small boards, the raster image scales to 1000x1000 and beyond
+    RENDERERS = {"rectangles": RectangleRenderer, "raster": RasterRenderer}
+
+    def __init__(self, window_width:int=960, window_height:int=720, grid_width:int=25, grid_height:int=20, renderer:str="rectangles") -> None:
         super().__init__()
 
         # variables
@@ -15,24 +23,63 @@ class Game(tk.Tk):
         self.window_width = window_width
         self.window_height = window_height
         self.control_panel_size = 0.15
-        self.rect_count = 500
-        self.rectid_arr = []
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.model = GridModel(grid_width, grid_height)
+        self.renderer_type = self.RENDERERS[renderer]
+        self.renderer = None
         self.is_searching = False
-        self.start_rect = None
-        self.end_rect = None
+        self.searcher = SearchRunner() # searches run on a worker thread, events come back in batches
+        self.search_job = None
+        self.pending_events = deque() # received from the worker, not painted yet
+        self.search_stats = None
+        self.search_algorithm = None # menu name of the running search, the menu can change meanwhile
+        self.stats_history = {} # algorithm -> stats of its last finished run, newest last
+        self.animation = None
+        self.frame_budget = 0.016 # seconds of painting per frame
+        self.resize_job = None
+        self.resize_delay = 50 # milliseconds
+        self.pending_size = window_width, window_height
+        self.cell_credit = 0.0
+        self.last_frame = 0.0
+        self.search_colors = ["blue", "light blue", "yellow"] # expanded, frontier, path
+        self.search_cells = [] # cells painted by the current search
+        self.changed_cells = set() # cells edited since the planner last saw the grid
+        self.algorithms = {
+            "A*": Pathfinding.iter_a_star,
+            "BFS": Pathfinding.iter_breadth_first,
+            # expands fewer nodes than A* on mazes and terrain only, more on open and random maps
+            "Bidirectional A* (mazes)": Pathfinding.iter_bidirectional_a_star,
+            "Bidirectional BFS": Pathfinding.iter_bidirectional_breadth_first,
+            "DFS": Pathfinding.iter_depth_first,
+            "Dijkstra": Pathfinding.iter_dijkstra,
+            "JPS": Pathfinding.iter_jump_point,
+            "JPS 8-way": lambda grid, start, end, stats=None: Pathfinding.iter_jump_point(grid, start, end, diagonal=True, stats=stats),
+            "D* Lite": self.replan,
+        }
+        self.planner = None
+
+        # left click paints walls or terrain that costs more to cross. A*, bidirectional A*, Dijkstra and D* Lite
+        # read the costs, BFS, bidirectional BFS and JPS report an error once terrain is painted and DFS ignores it
+        self.paint_modes = {"Walls": None, "Cost 2": 2, "Cost 4": 4, "Cost 8": 8}
+        self.cost_colors = {2: "tan", 4: "peru", 8: "saddle brown"}
 
         # window objects
         self.canvas = None
         self.start_button = None
         self.algo_menu = None
+        self.paint_menu = None
         self.clear_button = None
+        self.stats_label = None
 
-        self.start_rect_text = None
-        self.end_rect_text = None
+        self.labels = {} # "S" / "E": (text id, cell)
 
         # initialize
         self.__initialize()
 
+        # the canvas only mirrors the model
+        self.model.add_listener(self.on_model_change)
+
         # callbacks
         self.bind("<Configure>", self.on_window_update)
 
@@ -43,79 +90,93 @@ class Game(tk.Tk):
 
             # stop searching if obstacles states are changed
             if event.button in [InputEvent.MOUSE_LEFT, InputEvent.MOUSE_RIGHT] and self.is_searching:
-                self.is_searching = False
-                for rect in self.rectid_arr:
-                    color = self.canvas.itemconfig(rect)["fill"][4]
-                    if color == "blue":
-                        self.canvas.itemconfig(rect, fill="white")
-                
-                if self.start_rect is not None:
-                    self.canvas.itemconfig(self.start_rect, fill="green")
-                if self.end_rect is not None:
-                    self.canvas.itemconfig(self.end_rect, fill="green")
-
-            rect_id, = self.canvas.find_closest(event.pos_x, event.pos_y)
+                self.stop_search()
+                self.clear_search()
+
+            # cells are found from the pointer position, no canvas lookup needed
+            cell = self.renderer.cell_at(event.pos_x, event.pos_y)
+            if cell is None:
+                return
+
             if event.button == InputEvent.MOUSE_LEFT:
-                if rect_id in [self.start_rect, self.end_rect, self.start_rect_text, self.end_rect_text]:
+                if cell in [self.model.start, self.model.goal]:
                     return
 
                 # handle adding start rect
-                if self.start_rect is None:
-                    self.canvas.itemconfig(rect_id, fill="green")
-                    self.start_rect = rect_id
-                    
-                    # add text
-                    x0, y0, x1, y1 = self.canvas.coords(rect_id)
-                    center = x0 + (x1 - x0) / 2, y0 + (y1 - y0) / 2
-                    font_size = min((x1 - x0), (y1 - y0)) / 2
-                    self.start_rect_text = self.canvas.create_text(center[0], center[1], text="S", fill="black", font=('Helvetica', str(int(font_size)), 'bold'))
+                if self.model.start is None:
+                    self.model.set_start(cell)
                     return
 
                 # handle adding end rect
-                if self.end_rect is None:
-                    self.canvas.itemconfig(rect_id, fill="green")
-                    self.end_rect = rect_id
-
-                    # add text
-                    x0, y0, x1, y1 = self.canvas.coords(rect_id)
-                    center = x0 + (x1 - x0) / 2, y0 + (y1 - y0) / 2
-                    font_size = min((x1 - x0), (y1 - y0)) / 2
-                    self.end_rect_text = self.canvas.create_text(center[0], center[1], text="E", fill="black", font=('Helvetica', str(int(font_size)), 'bold'))
+                if self.model.goal is None:
+                    self.model.set_goal(cell)
                     return
 
-                self.canvas.itemconfig(rect_id, fill="red")
+                cost = self.paint_modes[self.paint_menu.text.get()]
+                if cost is None:
+                    self.model.set_wall(cell)
+                else:
+                    self.model.set_cost(cell, cost)
 
             if event.button == InputEvent.MOUSE_RIGHT:
-                self.is_searching = False
-                if rect_id in [self.start_rect, self.start_rect_text]:
-                    self.canvas.delete(self.start_rect_text)
-                    self.canvas.itemconfig(self.start_rect, fill="white")
-
-                    self.start_rect = None
-                    self.start_rect_text = None
-
-                if rect_id in [self.end_rect, self.end_rect_text]:
-                    self.canvas.delete(self.end_rect_text)
-                    self.canvas.itemconfig(self.end_rect, fill="white")
-
-                    self.end_rect = None
-                    self.end_rect_text = None
-
-                self.canvas.itemconfig(rect_id, fill="white")
+                self.stop_search()
+                self.model.erase(cell)
+
+    def on_model_change(self, cells:list[int]) -> None:
+        for cell in cells:
+            self.renderer.fill(cell, self.cell_color(cell))
+        self.changed_cells.update(cells)
+        self.update_labels()
+        self.renderer.flush()
+
+    def cell_color(self, cell:int) -> str:
+        if cell in (self.model.start, self.model.goal):
+            return "green"
+        if self.model.is_wall(cell):
+            return "red"
+        cost = self.model.cost(cell)
+        return "white" if cost == 1 else self.cost_colors.get(cost, "peru")
+
+    def update_labels(self, force:bool=False) -> None:
+        for text, cell in (("S", self.model.start), ("E", self.model.goal)):
+            text_id, placed = self.labels.get(text, (None, None))
+            if cell == placed and not force:
+                continue
+
+            # an endpoint that was never placed has no label to move or delete
+            if cell is None:
+                if text_id is not None:
+                    self.canvas.delete(text_id)
+                    del self.labels[text]
+                continue
+
+            if text_id is None:
+                text_id = self.canvas.create_text(0, 0, text=text, fill="black")
+            self.place_label(text_id, cell)
+            self.labels[text] = text_id, cell
 
     def on_window_update(self, event:tk.Event) -> None:
         # filter other events
         if event.widget != self:
             return
 
+        # a drag produces a burst of events, only the latest size is applied once the delay runs out.
+        # every event is kept, a drag that ends close to where it started must not leave an older size pending
+        self.pending_size = event.width, event.height
+        if self.resize_job is None:
+            self.resize_job = self.after(self.resize_delay, self.apply_resize)
+
+    def apply_resize(self) -> None:
+        self.resize_job = None
+
         # optimize updating
         min_pixel_diff = 5
-        if abs(self.window_height - event.height) < min_pixel_diff and abs(self.window_width - event.width) < min_pixel_diff:
+        width, height = self.pending_size
+        if abs(self.window_height - height) < min_pixel_diff and abs(self.window_width - width) < min_pixel_diff:
             return
-        
+
         # update window size
-        self.window_width = event.width
-        self.window_height = event.height
+        self.window_width, self.window_height = width, height
 
         # calculate space for controls
         canvas_width = self.window_width
@@ -124,37 +185,21 @@ class Game(tk.Tk):
         # change canvas size
         self.canvas.config(width=canvas_width, height=canvas_height)
 
-        # calculate row and column count
-        rects_per_side = int(sqrt(len(self.rectid_arr)))
-
-        # calculate rectangle size
-        rect_width = canvas_width / rects_per_side
-        rect_height = canvas_height / rects_per_side
-
         # update grid
-        for row in range(rects_per_side):
-            for col in range(rects_per_side):
-                rect_id = self.rectid_arr[rects_per_side * col + row]
-                self.canvas.coords(rect_id, rect_width * row, rect_height * col, rect_width * (row + 1), rect_height * (col + 1))
+        self.renderer.resize(canvas_width, canvas_height)
 
         self.calculate_size_and_pos()
 
         # calculate new position and size for start and end texts
-        if self.start_rect_text is not None:
-            x0, y0, x1, y1 = self.canvas.coords(self.start_rect)
-            center = x0 + (x1 - x0) / 2, y0 + (y1 - y0) / 2
-            font_size = min((x1 - x0), (y1 - y0)) / 2
+        self.update_labels(force=True)
 
-            self.canvas.coords(self.start_rect_text, center[0], center[1])
-            self.canvas.itemconfig(self.start_rect_text, text="S", fill="black", font=('Helvetica', str(int(font_size)), 'bold'))
+    def place_label(self, text_id:int, cell:int) -> None:
+        x0, y0, x1, y1 = self.renderer.bounds(cell)
+        center = x0 + (x1 - x0) / 2, y0 + (y1 - y0) / 2
+        font_size = max(min((x1 - x0), (y1 - y0)) / 2, 1)
 
-        if self.end_rect_text is not None:
-            x0, y0, x1, y1 = self.canvas.coords(self.end_rect)
-            center = x0 + (x1 - x0) / 2, y0 + (y1 - y0) / 2
-            font_size = min((x1 - x0), (y1 - y0)) / 2
-
-            self.canvas.coords(self.end_rect_text, center[0], center[1])
-            self.canvas.itemconfig(self.end_rect_text, text="E", fill="black", font=('Helvetica', str(int(font_size)), 'bold'))
+        self.canvas.coords(text_id, center[0], center[1])
+        self.canvas.itemconfig(text_id, font=('Helvetica', str(int(font_size)), 'bold'))
 
     def __initialize(self) -> None:
         # set screen title
@@ -178,18 +223,8 @@ class Game(tk.Tk):
         # create canvas
         self.canvas = tk.Canvas(self, bg="black", width=canvas_width, height=canvas_height)
         
-        # calculate row and column count
-        rects_per_side = int(sqrt(self.rect_count))
-
-        # calculate rectangle size
-        rect_width = canvas_width / rects_per_side
-        rect_height = canvas_height / rects_per_side
-
         # create grid
-        for col in range(rects_per_side):
-            for row in range(rects_per_side):
-                rect_id = self.canvas.create_rectangle(rect_width * row, rect_height * col, rect_width * (row + 1), rect_height * (col + 1), fill="white")
-                self.rectid_arr.append(rect_id)
+        self.renderer = self.renderer_type(self.canvas, self.grid_width, self.grid_height, canvas_width, canvas_height)
 
         # bind input callbacks
         self.canvas.bind("<Motion>", self.input_handler.on_mouse_move)
@@ -200,20 +235,31 @@ class Game(tk.Tk):
         self.start_button = tk.Button(self, text="START", command=self.start_game)
         self.start_button.pack()
 
-        menu_options = ["A*", "BFS", "DFS"]
+        menu_options = list(self.algorithms)
         algo_menu_text = tk.StringVar()
         algo_menu_text.set(menu_options[0])
         self.algo_menu = tk.OptionMenu(self, algo_menu_text, *menu_options)
         self.algo_menu.text = algo_menu_text
         self.algo_menu.pack()
 
-        self.speed_slider = ttk.Scale(self, from_=0.0, to=0.1, orient="horizontal")
-        self.speed_slider.set(0.05)
+        paint_options = list(self.paint_modes)
+        paint_menu_text = tk.StringVar()
+        paint_menu_text.set(paint_options[0])
+        self.paint_menu = tk.OptionMenu(self, paint_menu_text, *paint_options)
+        self.paint_menu.text = paint_menu_text
+        self.paint_menu.pack()
+
+        # cells per second on a log scale: 1 to 1 000 000
+        self.speed_slider = ttk.Scale(self, from_=0.0, to=6.0, orient="horizontal")
+        self.speed_slider.set(1.3)
         self.speed_slider.pack()
 
         self.clear_button = tk.Button(self, text="CLEAR", command=self.clear_game)
         self.clear_button.pack()
 
+        self.stats_label = tk.Label(self, text="", anchor="w")
+        self.stats_label.pack()
+
         self.calculate_size_and_pos()
 
         # pack canvas
@@ -231,6 +277,11 @@ class Game(tk.Tk):
         self.algo_menu.x = self.window_width / 2 - self.algo_menu.width / 2
         self.algo_menu.y = self.start_button.y
 
+        self.paint_menu.width = 0.2 * self.window_width
+        self.paint_menu.height = 0.03 * self.window_height
+        self.paint_menu.x = self.algo_menu.x
+        self.paint_menu.y = self.algo_menu.y - self.paint_menu.height - 2
+
         self.speed_slider.width = 0.2 * self.window_width
         self.speed_slider.height = 0.03 * self.window_height
         self.speed_slider.x = self.window_width / 2 - self.speed_slider.width / 2
@@ -241,69 +292,162 @@ class Game(tk.Tk):
         self.clear_button.x = self.window_width - self.window_width / 5 - self.clear_button.width / 2
         self.clear_button.y = self.start_button.y
 
+        self.stats_label.y = self.start_button.y + self.start_button.height
+        self.stats_label.height = max(self.window_height - self.stats_label.y, 1)
+
         # place items
         self.start_button.place(x=self.start_button.x, y=self.start_button.y, height=self.start_button.height, width=self.start_button.width)
         self.algo_menu.place(x=self.algo_menu.x, y=self.algo_menu.y, height=self.algo_menu.height, width=self.algo_menu.width)
+        self.paint_menu.place(x=self.paint_menu.x, y=self.paint_menu.y, height=self.paint_menu.height, width=self.paint_menu.width)
         self.speed_slider.place(x=self.speed_slider.x, y=self.speed_slider.y, height=self.speed_slider.height, width=self.speed_slider.width)
         self.clear_button.place(x=self.clear_button.x, y=self.clear_button.y, height=self.clear_button.height, width=self.clear_button.width)
+        self.stats_label.place(x=0, y=self.stats_label.y, height=self.stats_label.height, width=self.window_width)
 
     def clear_game(self) -> None:
-        self.is_searching = False
-        for item_id in self.rectid_arr:
-            self.canvas.itemconfig(item_id, fill="white")
-
-            if self.start_rect is not None:
-                self.canvas.delete(self.start_rect_text)
-                self.start_rect = None
-                self.start_rect_text = None
-
-            if self.end_rect is not None:
-                self.canvas.delete(self.end_rect_text)
-                self.end_rect = None
-                self.end_rect_text = None
-            
+        self.stop_search()
+        self.planner = None
+        self.clear_search()
+        self.model.clear()
+
+    def clear_search(self) -> None:
+        # only the cells the search painted need their model color back
+        for cell in self.search_cells:
+            self.renderer.fill(cell, self.cell_color(cell))
+        self.search_cells = []
+        self.renderer.flush()
+
     def start_game(self) -> None:
-        if self.start_rect is None or self.end_rect is None:
+        if self.model.start is None or self.model.goal is None:
             messagebox.showerror("Game error", "Please select a starting point and an ending point by right clicking empty rectangles.")
             return
 
-        if self.is_searching:
+        # a new search replaces the running one
+        self.stop_search()
+        self.clear_search()
+        self.is_searching = True
+
+        # the worker reads the model cells in place, any edit cancels the search
+        self.search_algorithm = self.algo_menu.text.get()
+        search = self.algorithms[self.search_algorithm]
+        stats = self.search_stats = SearchStats()
+        grid, start, goal = self.model.grid, self.model.start, self.model.goal
+        self.search_job = self.searcher.submit(lambda: Pathfinding.measure(search(grid, start, goal, stats=stats), stats))
+
+        # frames are scheduled on the event loop and only paint what the worker sent
+        if self.animation is not None:
+            self.after_cancel(self.animation)
+        self.cell_credit = 0.0
+        self.last_frame = time.perf_counter()
+        self.animation = self.after(0, self.animate)
+
+    def stop_search(self) -> None:
+        # the worker drops the search at its next node, whatever it already sent is thrown away
+        self.is_searching = False
+        self.searcher.cancel()
+        self.search_job = None
+        self.pending_events.clear()
+
+    def next_event(self) -> SearchEvent:
+        # None while the worker has not caught up with the animation
+        if not self.pending_events:
+            for item in self.search_job.poll():
+                if isinstance(item, Exception):
+                    self.stop_search()
+                    messagebox.showerror("Search error", str(item))
+                    return None
+                self.pending_events.extend(item)
+        return self.pending_events.popleft() if self.pending_events else None
+
+    def animate(self) -> None:
+        self.animation = None
+        if self.is_searching == False: # if clear is pressed or obstacles are changed, stop the search
             return
 
-        blacklist = []
-        for item_id in self.rectid_arr:
-            color = self.canvas.itemconfig(item_id)["fill"][4]
-            if color == "red":
-                blacklist.append(item_id)
+        # the slider is log10 of cells per second, leftover credit carries fractions to the next frame
+        now = time.perf_counter()
+        cells_per_second = 10 ** self.speed_slider.get()
+        self.cell_credit = min(self.cell_credit + cells_per_second * (now - self.last_frame), 1 + cells_per_second * self.frame_budget)
+        self.last_frame = now
 
-            if color == "blue":
-                self.canvas.itemconfig(item_id, fill="white")
+        start = self.model.start
+        end = self.model.goal
+        expanded_color, frontier_color, path_color = self.search_colors
 
-        self.canvas.itemconfig(self.start_rect, fill="green")
-        self.canvas.itemconfig(self.end_rect, fill="green")
-        self.is_searching = True
+        # paint as many events as the speed allows, but never more than fit in one frame
+        while self.cell_credit >= 1 and time.perf_counter() - now < self.frame_budget:
+            event = self.next_event()
+            if event is None:
+                break
 
-        path = []
-        if self.algo_menu.text.get() == "A*":
-            path = Pathfinding.search_a_star(self.start_rect, self.end_rect, len(self.rectid_arr), blacklist)
-        if self.algo_menu.text.get() == "BFS":
-            path = Pathfinding.search_breadth(self.start_rect, self.end_rect, len(self.rectid_arr), blacklist)
-        if self.algo_menu.text.get() == "DFS":
-            path = Pathfinding.search_depth(self.start_rect, self.end_rect, len(self.rectid_arr), blacklist)
-        
-        for rect in path:
-            if self.is_searching == False: # if clear is pressed or obstacles are changed, stop adding blue rects                    
+            if type(event) == ExpandEvent:
+                for cell in event.frontier:
+                    if cell != end:
+                        self.renderer.fill(cell, frontier_color)
+                        self.search_cells.append(cell)
+                if event.cell not in (start, end):
+                    self.renderer.fill(event.cell, expanded_color)
+                    self.search_cells.append(event.cell)
+                self.cell_credit -= 1
+
+            if type(event) == PathEvent:
+                for cell in event.path[1:-1]:
+                    self.renderer.fill(cell, path_color)
+                self.search_cells.extend(event.path[1:-1])
+                self.show_stats(self.search_algorithm, self.search_stats)
+                self.stop_search()
                 break
-            
-            self.canvas.itemconfig(rect, fill="blue")
-            self.update()
-            time.sleep(self.speed_slider.get())
 
-        self.is_searching = False
+        self.renderer.flush()
+        if self.is_searching:
+            # keep a steady frame rate: wait only for what is left of this frame
+            delay = self.frame_budget - (time.perf_counter() - now)
+            self.animation = self.after(max(int(delay * 1000), 1), self.animate)
+
+    def show_stats(self, algorithm:str, stats:SearchStats) -> None:
+        # the last two algorithms side by side
+        self.stats_history.pop(algorithm, None)
+        self.stats_history[algorithm] = stats
+        while len(self.stats_history) > 2:
+            del self.stats_history[next(iter(self.stats_history))]
+
+        self.stats_label.config(text="    |    ".join(
+            f"{name}: {run.expanded} expanded, open peak {run.peak_open}, {run.pushes} pushes / {run.pops} pops, "
+            f"{run.elapsed * 1000:.1f} ms, path {max(run.path_length - 1, 0)}"
+            for name, run in reversed(self.stats_history.items())))
+
+    def replan(self, grid:Grid, start:int, end:int, stats:SearchStats=None):
+        # keep the planner between runs and only hand it the cells that changed
+        # the planner keeps its own copy of the cells to diff the model edits against.
+        # this runs on the worker: edited cells are taken out of the set before the grid is read,
+        # so an edit made meanwhile stays in the set for the next run
+        if self.planner is None or self.planner.goal != end:
+            self.changed_cells.clear()
+            planner_grid = Grid(grid.width, grid.height, cells=bytearray(grid.cells))
+            planner_grid.costs = None if grid.costs is None else bytearray(grid.costs)
+            self.planner = IncrementalPlanner(planner_grid, end)
+            return self.planner.iter_find_path(start, stats=stats)
+
+        edited = list(self.changed_cells)
+        self.changed_cells.difference_update(edited)
+        planner_grid = self.planner.grid
+        changed = [cell for cell in edited if planner_grid.is_wall(cell) != grid.is_wall(cell) or planner_grid.cost(cell) != grid.cost(cell)]
+        for cell in changed:
+            planner_grid.set_wall(cell, grid.is_wall(cell))
+            planner_grid.set_cost(cell, grid.cost(cell))
+        self.planner.update_cells(changed)
+        return self.planner.iter_find_path(start, stats=stats)
 
     def run(self) -> None:
         super().mainloop()
+        self.searcher.shutdown()
 
 if __name__ == "__main__":
-    game = Game(window_width=600, window_height=700)
+    parser = argparse.ArgumentParser(description="Interactive pathfinding visualizer.")
+    parser.add_argument("--size", default="25x20", help="grid size as WIDTHxHEIGHT")
+    parser.add_argument("--renderer", default=None, choices=sorted(Game.RENDERERS), help="defaults to raster for grids over 10000 cells")
+    args = parser.parse_args()
+
+    grid_width, grid_height = (int(value) for value in args.size.lower().split("x"))
+    renderer = args.renderer or ("raster" if grid_width * grid_height > 10000 else "rectangles")
+    game = Game(window_width=600, window_height=700, grid_width=grid_width, grid_height=grid_height, renderer=renderer)
     game.run()
\ No newline at end of file
@@ -0,0 +1,149 @@
+import mmap
+import struct
+
+from pathfinding import Grid
+
+# characters that can be walked on in text and Moving AI maps, everything else is a wall
+PASSABLE = ".GS"
+_TO_CELLS = bytes(Grid.FREE if chr(char) in PASSABLE else Grid.WALL for char in range(256))
+
+# binary maps: header, then the padded cells exactly as Grid stores them (or packed 8 per byte),
+# then the padded terrain costs one byte per cell if the map has any
+MAGIC = b"PFGM"
+HEADER = struct.Struct("<4sHHII") # magic, format version, flags, width, height
+FORMAT_VERSION = 1
+FLAG_PACKED = 1
+FLAG_COSTS = 2
+
+# packed maps go through a string of '0' and '1', which int() converts in linear time
+_TO_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+_FROM_DIGITS = bytes.maketrans(b"01", b"\x00\x01")
+
+class Scenario:
+    def __init__(self, bucket:int, map_name:str, width:int, height:int, start_x:int, start_y:int, goal_x:int, goal_y:int, optimal_length:float) -> None:
+        self.bucket = bucket
+        self.map_name = map_name
+        self.width = width
+        self.height = height
+        self.start_x = start_x
+        self.start_y = start_y
+        self.goal_x = goal_x
+        self.goal_y = goal_y
+        self.optimal_length = optimal_length
+
+def parse_text(lines:list[str]) -> Grid:
+    rows = [line.rstrip("\r\n") for line in lines]
+    while rows and not rows[-1]:
+        rows.pop()
+    if not rows:
+        raise ValueError("map has no rows")
+
+    width = max(len(row) for row in rows)
+    grid = Grid(width, len(rows))
+    for y, row in enumerate(rows):
+        # short rows are padded with walls
+        node = grid.node(y * width)
+        grid.cells[node:node + width] = row.ljust(width, "@").encode("latin-1", "replace").translate(_TO_CELLS)
+    grid.version += 1
+    return grid
+
+def load_text(path:str) -> Grid:
+    with open(path) as file:
+        return parse_text(file.readlines())
+
+def save_text(grid:Grid, path:str) -> None:
+    with open(path, "w") as file:
+        for y in range(grid.height):
+            file.write("".join("@" if grid.is_wall(y * grid.width + x) else "." for x in range(grid.width)) + "\n")
+
+def load_map(path:str) -> Grid:
+    # pick the reader from the file extension
+    if path.endswith(".grid"):
+        return load_binary(path)
+    if path.endswith(".map"):
+        return load_movingai_map(path)
+    return load_text(path)
+
+def save_binary(grid:Grid, path:str, packed:bool=False) -> None:
+    flags = (FLAG_PACKED if packed else 0) | (FLAG_COSTS if grid.costs is not None else 0)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, flags, grid.width, grid.height))
+        if not packed:
+            file.write(grid.cells)
+        else:
+            # 8 cells per byte, most significant bit first
+            digits = bytes(grid.cells).translate(_TO_DIGITS)
+            digits += b"0" * (-len(digits) % 8)
+            file.write(int(digits, 2).to_bytes(len(digits) // 8, "big"))
+        if grid.costs is not None:
+            file.write(grid.costs)
+
+def load_binary(path:str) -> Grid:
+    with open(path, "rb") as file:
+        header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is truncated")
+        magic, version, flags, width, height = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary map")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has unsupported map format version {version}")
+        if flags & ~(FLAG_PACKED | FLAG_COSTS):
+            raise ValueError(f"{path} has unknown map flags {flags:#x}")
+
+        size = (width + 2) * (height + 2)
+        cost_size = size if flags & FLAG_COSTS else 0
+        if flags & FLAG_PACKED:
+            packed = file.read((size + 7) // 8)
+            costs = file.read(cost_size)
+            if len(packed) < (size + 7) // 8 or len(costs) < cost_size:
+                raise ValueError(f"{path} is truncated")
+            digits = format(int.from_bytes(packed, "big"), f"0{len(packed) * 8}b").encode()
+            grid = Grid(width, height, cells=bytearray(digits[:size].translate(_FROM_DIGITS)))
+            grid.costs = bytearray(costs) if cost_size else None
+            return grid
+
+        # byte maps are used in place: copy-on-write pages are shared until a cell is edited
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+        if len(buffer) < HEADER.size + size + cost_size:
+            raise ValueError(f"{path} is truncated")
+        grid = Grid(width, height, cells=memoryview(buffer)[HEADER.size:HEADER.size + size])
+        if cost_size:
+            grid.costs = memoryview(buffer)[HEADER.size + size:HEADER.size + size + cost_size]
+        return grid
+
+def load_movingai_map(path:str) -> Grid:
+    # header lines (type, height, width) followed by "map" and the rows
+    with open(path) as file:
+        header = {}
+        for line in file:
+            line = line.strip()
+            if line == "map":
+                break
+            key, _, value = line.partition(" ")
+            header[key] = value.strip()
+        rows = file.readlines()
+
+    if "width" not in header or "height" not in header:
+        raise ValueError(f"{path} is missing the width or height header")
+    width = int(header["width"])
+    height = int(header["height"])
+
+    grid = parse_text(rows[:height])
+    if grid.width != width or grid.height != height:
+        raise ValueError(f"{path} is {grid.width}x{grid.height}, header says {width}x{height}")
+    return grid
+
+def load_movingai_scen(path:str) -> list[Scenario]:
+    scenarios = []
+    with open(path) as file:
+        for line in file:
+            fields = line.split()
+            if not fields or fields[0] == "version":
+                continue
+            if len(fields) != 9:
+                raise ValueError(f"{path}: expected 9 fields in '{line.strip()}'")
+            bucket, map_name = int(fields[0]), fields[1]
+            width, height, start_x, start_y, goal_x, goal_y = (int(value) for value in fields[2:8])
+            scenarios.append(Scenario(bucket, map_name, width, height, start_x, start_y, goal_x, goal_y, float(fields[8])))
+    return scenarios
@@ -0,0 +1,102 @@
+from typing import Callable
+
+from pathfinding import Grid
+
+class GridModel:
+    def __init__(self, width:int, height:int, grid:Grid=None) -> None:
+        self.width = width
+        self.height = height
+
+        # the grid cells are the state array, searches read them directly without a copy
+        self.grid = grid if grid is not None else Grid(width, height)
+        self.start = None
+        self.goal = None
+        self.listeners = []
+
+    def add_listener(self, callback:Callable[[list[int]], None]) -> None:
+        # callbacks get the cells whose state changed
+        self.listeners.append(callback)
+
+    def notify(self, cells:list[int]) -> None:
+        for callback in self.listeners:
+            callback(cells)
+
+    def is_wall(self, cell:int) -> bool:
+        return self.grid.is_wall(cell)
+
+    def set_wall(self, cell:int, wall:bool=True) -> None:
+        if cell in (self.start, self.goal) or self.grid.is_wall(cell) == wall:
+            return
+        self.grid.set_wall(cell, wall)
+        self.notify([cell])
+
+    def cost(self, cell:int) -> int:
+        return self.grid.cost(cell)
+
+    def set_cost(self, cell:int, cost:int) -> None:
+        # painting terrain over a wall opens the cell
+        if self.grid.cost(cell) == cost and not self.grid.is_wall(cell):
+            return
+        if self.grid.is_wall(cell):
+            self.grid.set_wall(cell, False)
+        self.grid.set_cost(cell, cost)
+        self.notify([cell])
+
+    def set_start(self, cell:int) -> None:
+        previous, self.start = self.start, cell
+        self.notify(self._free_endpoint(previous, cell))
+
+    def set_goal(self, cell:int) -> None:
+        previous, self.goal = self.goal, cell
+        self.notify(self._free_endpoint(previous, cell))
+
+    def erase(self, cell:int) -> None:
+        # back to an empty cell, whatever it was
+        if cell == self.start:
+            self.start = None
+        if cell == self.goal:
+            self.goal = None
+        if self.grid.is_wall(cell):
+            self.grid.set_wall(cell, False)
+        self.grid.set_cost(cell, 1)
+        self.notify([cell])
+
+    def weighted(self) -> list[int]:
+        # cells that cost more than 1 to enter
+        if self.grid.costs is None:
+            return []
+        cells = []
+        for y in range(self.height):
+            node = self.grid.node(y * self.width)
+            row = bytes(self.grid.costs[node:node + self.width])
+            if row.count(1) != self.width:
+                cells.extend(y * self.width + x for x, cost in enumerate(row) if cost > 1)
+        return cells
+
+    def walls(self) -> list[int]:
+        cells = []
+        for y in range(self.height):
+            node = self.grid.node(y * self.width)
+            row = bytes(self.grid.cells[node:node + self.width])
+            x = row.find(Grid.WALL)
+            while x != -1:
+                cells.append(y * self.width + x)
+                x = row.find(Grid.WALL, x + 1)
+        return cells
+
+    def clear(self) -> None:
+        cells = self.walls() + self.weighted() + [cell for cell in (self.start, self.goal) if cell is not None]
+        for y in range(self.height):
+            node = self.grid.node(y * self.width)
+            self.grid.cells[node:node + self.width] = bytes(self.width)
+        self.grid.costs = None
+        self.grid.version += 1
+        self.start = None
+        self.goal = None
+        self.notify(cells)
+
+    def _free_endpoint(self, previous:int, cell:int) -> list[int]:
+        # start and goal can be dropped on walls, the wall goes away
+        if cell is not None and self.grid.is_wall(cell):
+            self.grid.set_wall(cell, False)
+        return [c for c in (previous, cell) if c is not None]
@@ -1,216 +1,1081 @@
-from math import sqrt
+import threading
+import tracemalloc
+from array import array
+from collections import deque
+from heapq import heappop, heappush
+from math import isqrt, sqrt
+from time import perf_counter
+from typing import Callable, Iterator
 
 class Stack:
-    def __init__(self, arr_items:list=[]) -> None:
-        self.array = arr_items
+    def __init__(self, arr_items:list=None) -> None:
+        self.array = arr_items if arr_items is not None else []
 
     def add(self, obj) -> None:
-        self.array.insert(0, obj)
+        self.array.append(obj)
 
     def pop(self):
-        return self.array.pop(0)
+        return self.array.pop()
 
     def is_empty(self) -> bool:
         return len(self.array) == 0
 
 class Queue:
-    def __init__(self, arr_items:list=[]) -> None:
-        self.array = arr_items
+    def __init__(self, arr_items:list=None) -> None:
+        self.array = deque(arr_items if arr_items is not None else [])
 
     def add(self, obj) -> None:
         self.array.append(obj)
 
     def pop(self):
-        return self.array.pop(0)
+        return self.array.popleft()
 
     def is_empty(self) -> bool:
         return len(self.array) == 0
 
-class Node:
-    def __init__(self, parent=None, position=None):
-        self.parent = parent
-        self.position = position
-        self.g = self.h = self.f = 0
+class Grid:
+    FREE = 0
+    WALL = 1
+    DIAGONAL_COST = sqrt(2)
+    MAX_COST = 255
+
+    def __init__(self, width:int, height:int, cells=None) -> None:
+        self.width = width
+        self.height = height
+
+        # cells are stored row by row with a border of walls around the map,
+        # so a neighbour is always a fixed offset away and never out of bounds
+        self.stride = width + 2
+        if cells is not None:
+            # an existing padded buffer such as shared memory, used without copying
+            self.cells = cells
+        else:
+            self.cells = bytearray([Grid.WALL]) * (self.stride * (height + 2))
+            for row in range(height):
+                node = self.node(row * width)
+                self.cells[node:node + width] = bytes(width)
+
+        # right, left, up, down
+        self.offsets = (1, -1, -self.stride, self.stride)
+
+        # moves are (offset, cost, corner_a, corner_b), a diagonal move needs both corners free
+        self.moves = tuple((offset, 1, 0, 0) for offset in self.offsets)
+        self.diagonal_moves = tuple((dx + dy, Grid.DIAGONAL_COST, dx, dy) for dx in (1, -1) for dy in (-self.stride, self.stride))
+
+        # terrain cost of entering each cell, laid out like cells. None until a cell costs more than 1
+        self.costs = None
+
+        # bumped on every change so cached results can tell if they are stale
+        self.version = 0
+
+        # (version, cost layer, (cheapest, most expensive)) from the last cost_range scan
+        self.cost_range_cache = None
+
+    @classmethod
+    def from_blacklist(cls, arr_size:int, blacklist:list[int]) -> "Grid":
+        # legacy input: a square of 1-based canvas ids
+        arr_side = isqrt(arr_size)
+        grid = cls(arr_side, arr_side)
+        for rect in blacklist:
+            grid.set_wall(rect - 1)
+        return grid
+
+    def node(self, cell:int) -> int:
+        row, col = divmod(cell, self.width)
+        return (row + 1) * self.stride + col + 1
+
+    def cell(self, node:int) -> int:
+        row, col = divmod(node, self.stride)
+        return (row - 1) * self.width + col - 1
+
+    def is_wall(self, cell:int) -> bool:
+        return self.cells[self.node(cell)] == Grid.WALL
+
+    def set_wall(self, cell:int, wall:bool=True) -> None:
+        self.cells[self.node(cell)] = Grid.WALL if wall else Grid.FREE
+        self.version += 1
+
+    def cost(self, cell:int) -> int:
+        return 1 if self.costs is None else self.costs[self.node(cell)]
+
+    def set_cost(self, cell:int, cost:int) -> None:
+        if not 1 <= cost <= Grid.MAX_COST:
+            raise ValueError(f"cell cost must be between 1 and {Grid.MAX_COST}, got {cost}")
+        if self.costs is None:
+            if cost == 1:
+                return
+            self.costs = bytearray([1]) * len(self.cells)
+        self.costs[self.node(cell)] = cost
+        self.version += 1
+
+    def cost_range(self) -> tuple[int, int]:
+        # cheapest and most expensive cell, row slices keep the border out of it.
+        # the scan reads the whole map, so it is repeated only after the grid changed
+        if self.costs is None:
+            return 1, 1
+        cache = self.cost_range_cache
+        if cache is not None and cache[0] == self.version and cache[1] is self.costs:
+            return cache[2]
+        low, high = Grid.MAX_COST, 1
+        for row in range(self.height):
+            node = self.node(row * self.width)
+            line = self.costs[node:node + self.width]
+            low = min(low, min(line))
+            high = max(high, max(line))
+        self.cost_range_cache = self.version, self.costs, (low, high)
+        return low, high
+
+class SearchEvent:
+    def __init__(self) -> None:
+        pass
+
+class ExpandEvent(SearchEvent):
+    def __init__(self, cell:int=None, frontier:list[int]=None) -> None:
+        self.cell = cell
+        self.frontier = frontier
+
+class PathEvent(SearchEvent):
+    def __init__(self, path:list[int]=None) -> None:
+        self.path = path
+
+class SearchStats:
+    def __init__(self, on_expand:Callable[[int], None]=None, track_memory:bool=False) -> None:
+        # on_expand is called with every expanded cell, memory tracking uses tracemalloc and slows the search down
+        self.on_expand = on_expand
+        self.track_memory = track_memory
+        self.reset()
+
+    def reset(self) -> None:
+        self.expanded = 0
+        self.peak_open = 0
+        self.pushes = 0
+        self.pops = 0
+        self.elapsed = 0.0
+        self.memory_peak = 0
+        self.path_length = 0
+
+    def expand(self, cell:int, open_size:int) -> None:
+        self.expanded += 1
+        if open_size > self.peak_open:
+            self.peak_open = open_size
+        if self.on_expand is not None:
+            self.on_expand(cell)
+
+    def __repr__(self) -> str:
+        return (f"SearchStats(expanded={self.expanded}, peak_open={self.peak_open}, pushes={self.pushes}, pops={self.pops}, "
+                f"elapsed={self.elapsed:.6f}, memory_peak={self.memory_peak}, path_length={self.path_length})")
+
+class SearchState:
+    # idle states by size, shared by every search so a query never allocates per node arrays
+    pool = {}
+    pool_lock = threading.Lock()
+
+    # a bidirectional search holds two states at once, more idle ones of a size are dropped on release
+    MAX_IDLE = 2
 
-    def __eq__(self, __o: object) -> bool:
-        return self.position == __o.position
+    # padded node count above which the arrays are typed instead of lists, a bit over 1022x1022 cells
+    TYPED_ABOVE = 1 << 20
+
+    # stamps in a typed mark array must stay below 2 ** 31
+    MAX_GENERATION = (1 << 31) - 2
+
+    def __init__(self, size:int) -> None:
+        # struct of arrays indexed by padded node. parents and g only mean something for nodes
+        # stamped in this generation: mark == generation once reached, generation + 1 once closed.
+        # plain lists are fastest, array("i") boxes a new int on every read and makes full map searches
+        # up to 1.5x slower. lists cost 8 bytes per node and a boxed int or float for every value written,
+        # about 65 MB kept per state on 1024x1024, so large maps take the 16 bytes per node of typed arrays
+        self.size = size
+        if size > SearchState.TYPED_ABOVE:
+            self.parents = array("i", bytes(4 * size))
+            self.g = array("d", bytes(8 * size))
+            self.mark = array("i", bytes(4 * size))
+        else:
+            self.parents = [0] * size
+            self.g = [0] * size
+            self.mark = [0] * size
+        self.generation = 0
+
+    @classmethod
+    def acquire(cls, size:int) -> "SearchState":
+        with cls.pool_lock:
+            idle = cls.pool.get(size)
+            state = idle.pop() if idle else None
+        if state is None:
+            state = cls(size)
+        state.reset()
+        return state
+
+    @classmethod
+    def clear_pool(cls) -> None:
+        # frees the arrays kept for earlier map sizes
+        with cls.pool_lock:
+            cls.pool.clear()
+
+    def release(self) -> None:
+        with SearchState.pool_lock:
+            idle = SearchState.pool.setdefault(self.size, [])
+            if len(idle) < SearchState.MAX_IDLE:
+                idle.append(self)
+
+    def reset(self) -> None:
+        # forgets every node at once, the marks are only cleared when the stamps run out
+        self.generation += 2
+        if self.generation > SearchState.MAX_GENERATION:
+            self.mark[:] = array("i", bytes(4 * self.size)) if type(self.mark) == array else [0] * self.size
+            self.generation = 2
 
 class Pathfinding:
     @staticmethod
-    def search_a_star(start_index:int, end_index:int, arr_size:int, blacklist:list[int]) -> list[int]:
-        start_node = Node(parent=None, position=start_index)
-        start_node.g = start_node.h = start_node.f = 0
-        end_node = Node(parent=None, position=end_index)
-        end_node.g = end_node.h = end_node.f = 0
-        arr_side = int(sqrt(arr_size))
+    def iter_a_star(grid:Grid, start:int, goal:int, trace:bool=True, heuristic:Callable[[int], int]=None, diagonal:bool=False, stats:SearchStats=None) -> Iterator[SearchEvent]:
+        cells = grid.cells
+        stride = grid.stride
+        start_node = grid.node(start)
+        goal_node = grid.node(goal)
+
+        # no path can start or end in a wall
+        if cells[start_node] or cells[goal_node]:
+            yield PathEvent(path=[])
+            return
+
+        goal_row, goal_col = divmod(goal_node, stride)
+
+        # per node arrays come from the shared pool, stamps tell this search's nodes from older ones
+        state = SearchState.acquire(len(cells))
+        best_g, parents, mark = state.g, state.parents, state.mark
+        opened = state.generation
+        closed = opened + 1
+        moves = grid.moves + grid.diagonal_moves if diagonal else grid.moves
+
+        # entering a cell costs its terrain cost, every step costs at least the cheapest one
+        costs = grid.costs
+        min_cost = grid.cost_range()[0]
+
+        # a heuristic written for 4-way moves overestimates diagonal ones and loses shortest paths without a sign,
+        # so 8-way searches only take heuristics that set heuristic.diagonal, such as Landmarks(diagonal=True)
+        if heuristic is not None and diagonal and not getattr(heuristic, "diagonal", False):
+            raise ValueError("8-way A* needs a heuristic made for diagonal moves, such as landmarks built with diagonal=True")
+
+        # heuristic is called with padded node indices, manhattan or octile distance scaled by min_cost by default
+        if heuristic is None and diagonal:
+            octile = Pathfinding._octile_to(grid, goal_node)
+            heuristic = octile if min_cost == 1 else lambda node: octile(node) * min_cost
+        if heuristic is None:
+            start_row, start_col = divmod(start_node, stride)
+            start_h = (abs(start_row - goal_row) + abs(start_col - goal_col)) * min_cost
+        else:
+            start_h = heuristic(start_node)
 
-        # initialize open and closed list
-        open_list = [start_node]
-        closed_list = []
+        # open list is a binary heap of (f, h, node), stale entries are skipped when popped
+        open_list = [(start_h, start_h, start_node)]
+        best_g[start_node] = 0
+        mark[start_node] = opened
 
-        # loop through open list
         while open_list:
-            cur_node:Node = open_list[0]
-            cur_node_index = 0
-
-            # get last rect
-            for index, node in enumerate(open_list):
-                if node.f < cur_node.f: # closer to end rect -> closer to last rect
-                    cur_node = node
-                    cur_node_index = index
-
-            # move to closed list
-            open_list.pop(cur_node_index)
-            closed_list.append(cur_node)
-
-            # found last rect
-            if cur_node == end_node:
-                result = []
-                parent = cur_node
-                while parent is not None:
-                    result.append(parent.position)
-                    parent =  parent.parent
-
-                # reverse path
-                return result[::-1]
-
-            # rects next to current rect
-            children = []
-            rect_right = cur_node.position + 1
-            rect_left = cur_node.position - 1
-            rect_up = cur_node.position - arr_side
-            rect_down = cur_node.position + arr_side
-
-            # move right
-            on_right_side = float((cur_node.position) / (arr_side)).is_integer()
-            if on_right_side == False and rect_right not in blacklist:
-                children.append(Node(parent=cur_node, position=rect_right))
-
-            # move left
-            on_left_side = rect_left % arr_side == 0
-            if on_left_side == False and rect_left not in blacklist:
-                children.append(Node(parent=cur_node, position=rect_left))
-
-            # move up
-            on_up_side = cur_node.position < (arr_side - 1)
-            if on_up_side == False and rect_up not in blacklist:
-                children.append(Node(parent=cur_node, position=rect_up))
-
-            # move down
-            on_down_side = cur_node.position >= pow(arr_side, exp=2) - arr_side
-            if on_down_side == False and rect_down not in blacklist:
-                children.append(Node(parent=cur_node, position=rect_down))
-
-            for child in children:
-                if child in closed_list:
+            _, _, node = heappop(open_list)
+            if stats is not None:
+                stats.pops += 1
+            if mark[node] == closed:
+                continue
+            mark[node] = closed
+
+            if stats is not None:
+                stats.expand(grid.cell(node), len(open_list))
+
+            # found goal
+            if node == goal_node:
+                if trace:
+                    yield ExpandEvent(cell=grid.cell(node), frontier=[])
+                path = Pathfinding._build_path(grid, parents, start_node, node)
+                state.release()
+                yield PathEvent(path=path)
+                return
+
+            frontier = []
+            node_g = best_g[node]
+            for offset, cost, corner_a, corner_b in moves:
+                child = node + offset
+                if cells[child] or mark[child] == closed:
+                    continue
+                if corner_a and (cells[node + corner_a] or cells[node + corner_b]):
                     continue
 
-                # calculate f, g, h
-                child_row = int(child.position / arr_side)
-                if float(child.position / arr_side).is_integer():
-                    child_row -= 1
-                child_col = (child.position - 1) % arr_side
-                
-                end_row = int(end_node.position / arr_side)
-                if float(end_node.position / arr_side).is_integer():
-                    end_row -= 1                
-                end_col = (end_node.position - 1) % arr_side
-
-                child.g = cur_node.g + 1
-                child.h = ((child_row - end_row) ** 2) + ((child_col - end_col) ** 2)
-                child.f = child.g + child.h
-
-                # filter nodes already in open list
-                for open_node in open_list:
-                    if child == open_node and child.g > open_node.g:
-                        continue
+                # drop children that are not better than an already queued duplicate
+                child_g = node_g + (cost if costs is None else cost * costs[child])
+                if mark[child] == opened and best_g[child] <= child_g:
+                    continue
+                mark[child] = opened
+                best_g[child] = child_g
+                parents[child] = node
 
-                open_list.append(child)
+                # manhattan distance never overestimates on a 4-connected grid
+                if heuristic is None:
+                    child_row, child_col = divmod(child, stride)
+                    child_h = (abs(child_row - goal_row) + abs(child_col - goal_col)) * min_cost
+                else:
+                    child_h = heuristic(child)
+                heappush(open_list, (child_g + child_h, child_h, child))
+                if stats is not None:
+                    stats.pushes += 1
+                if trace:
+                    frontier.append(grid.cell(child))
+
+            if trace:
+                yield ExpandEvent(cell=grid.cell(node), frontier=frontier)
+
+        state.release()
+        yield PathEvent(path=[])
 
-        return []
-    
     @staticmethod
-    def search_depth(start_index:int, end_index:int, arr_size:int, blacklist:list[int]) -> list[int]:
-        result = []
-        arr = Stack([start_index])
-        arr_side = int(sqrt(arr_size))
+    def iter_depth_first(grid:Grid, start:int, goal:int, trace:bool=True, stats:SearchStats=None) -> Iterator[SearchEvent]:
+        cells = grid.cells
+        start_node = grid.node(start)
+        goal_node = grid.node(goal)
+
+        # no path can start or end in a wall
+        if cells[start_node] or cells[goal_node]:
+            yield PathEvent(path=[])
+            return
+
+        # parents and visited stamps come from the shared pool
+        state = SearchState.acquire(len(cells))
+        parents, mark = state.parents, state.mark
+        visited = state.generation
+
+        # stack holds (node, parent) pairs, a node is visited when it is first popped
+        arr = Stack([(start_node, start_node)])
 
         while arr.is_empty() == False:
-            index = arr.pop()
-            if index in result:
+            node, parent = arr.pop()
+            if stats is not None:
+                stats.pops += 1
+            if mark[node] == visited:
                 continue
-            result.append(index)
-
-            # rects next to current rect
-            rect_right = index + 1
-            rect_left = index - 1
-            rect_up = index - arr_side
-            rect_down = index + arr_side
-
-            # move right
-            on_right_side = float((index) / (arr_side)).is_integer()
-            if on_right_side == False and rect_right not in blacklist:
-                arr.add(rect_right)
-
-            # move left
-            on_left_side = rect_left % arr_side == 0
-            if on_left_side == False and rect_left not in blacklist:
-                arr.add(rect_left)
-
-            # move up
-            on_up_side = index < (arr_side - 1)
-            if on_up_side == False and rect_up not in blacklist:
-                arr.add(rect_up)
-
-            # move down
-            on_down_side = index >= pow(arr_side, exp=2) - arr_side
-            if on_down_side == False and rect_down not in blacklist:
-                arr.add(rect_down)
-
-            if index == end_index:
-                break
+            mark[node] = visited
+            parents[node] = parent
+            if stats is not None:
+                stats.expand(grid.cell(node), len(arr.array))
 
-        return result
+            if node == goal_node:
+                if trace:
+                    yield ExpandEvent(cell=grid.cell(node), frontier=[])
+                path = Pathfinding._build_path(grid, parents, start_node, node)
+                state.release()
+                yield PathEvent(path=path)
+                return
+
+            frontier = []
+            for offset in grid.offsets:
+                child = node + offset
+                if not cells[child] and mark[child] != visited:
+                    arr.add((child, node))
+                    if stats is not None:
+                        stats.pushes += 1
+                    if trace:
+                        frontier.append(grid.cell(child))
+
+            if trace:
+                yield ExpandEvent(cell=grid.cell(node), frontier=frontier)
+
+        state.release()
+        yield PathEvent(path=[])
 
     @staticmethod
-    def search_breadth(start_index:int, end_index:int, arr_size:int, blacklist:list[int]) -> list[int]:
-        result = []
-        arr = Queue([start_index])
-        arr_side = int(sqrt(arr_size))
+    def iter_breadth_first(grid:Grid, start:int, goal:int, trace:bool=True, stats:SearchStats=None) -> Iterator[SearchEvent]:
+        Pathfinding._check_uniform(grid, "BFS")
+        cells = grid.cells
+        start_node = grid.node(start)
+        goal_node = grid.node(goal)
+
+        # no path can start or end in a wall
+        if cells[start_node] or cells[goal_node]:
+            yield PathEvent(path=[])
+            return
+
+        # parents and visited stamps come from the shared pool
+        state = SearchState.acquire(len(cells))
+        parents, mark = state.parents, state.mark
+        visited = state.generation
+        mark[start_node] = visited
+        arr = Queue([start_node])
 
         while arr.is_empty() == False:
-            index = arr.pop()
-            if index in result:
+            node = arr.pop()
+            if stats is not None:
+                stats.pops += 1
+                stats.expand(grid.cell(node), len(arr.array))
+
+            if node == goal_node:
+                if trace:
+                    yield ExpandEvent(cell=grid.cell(node), frontier=[])
+                path = Pathfinding._build_path(grid, parents, start_node, node)
+                state.release()
+                yield PathEvent(path=path)
+                return
+
+            frontier = []
+            for offset in grid.offsets:
+                child = node + offset
+                if not cells[child] and mark[child] != visited:
+                    mark[child] = visited
+                    parents[child] = node
+                    arr.add(child)
+                    if stats is not None:
+                        stats.pushes += 1
+                    if trace:
+                        frontier.append(grid.cell(child))
+
+            if trace:
+                yield ExpandEvent(cell=grid.cell(node), frontier=frontier)
+
+        state.release()
+        yield PathEvent(path=[])
+
+    @staticmethod
+    def iter_jump_point(grid:Grid, start:int, goal:int, trace:bool=True, diagonal:bool=False, stats:SearchStats=None) -> Iterator[SearchEvent]:
+        Pathfinding._check_uniform(grid, "JPS")
+        cells = grid.cells
+        stride = grid.stride
+        start_node = grid.node(start)
+        goal_node = grid.node(goal)
+
+        # no path can start or end in a wall
+        if cells[start_node] or cells[goal_node]:
+            yield PathEvent(path=[])
+            return
+
+        goal_row, goal_col = divmod(goal_node, stride)
+
+        # per node arrays come from the shared pool, stamps tell this search's nodes from older ones
+        state = SearchState.acquire(len(cells))
+        best_g, parents, mark = state.g, state.parents, state.mark
+        opened = state.generation
+        closed = opened + 1
+
+        start_h = Pathfinding._distance(divmod(start_node, stride), (goal_row, goal_col), diagonal)
+        open_list = [(start_h, start_h, start_node)]
+        best_g[start_node] = 0
+        parents[start_node] = start_node
+        mark[start_node] = opened
+
+        while open_list:
+            _, _, node = heappop(open_list)
+            if stats is not None:
+                stats.pops += 1
+            if mark[node] == closed:
                 continue
-            result.append(index)
-
-            # rects next to current rect
-            rect_right = index + 1
-            rect_left = index - 1
-            rect_up = index - arr_side
-            rect_down = index + arr_side
-
-            # move right
-            on_right_side = float((index) / (arr_side)).is_integer()
-            if on_right_side == False and rect_right not in blacklist:
-                arr.add(rect_right)
-
-            # move left
-            on_left_side = rect_left % arr_side == 0
-            if on_left_side == False and rect_left not in blacklist:
-                arr.add(rect_left)
-
-            # move up
-            on_up_side = index < (arr_side - 1)
-            if on_up_side == False and rect_up not in blacklist:
-                arr.add(rect_up)
-
-            # move down
-            on_down_side = index >= pow(arr_side, exp=2) - arr_side
-            if on_down_side == False and rect_down not in blacklist:
-                arr.add(rect_down)
-
-            if index == end_index:
+            mark[node] = closed
+            if stats is not None:
+                stats.expand(grid.cell(node), len(open_list))
+
+            # found goal, fill in the straight runs between jump points
+            if node == goal_node:
+                if trace:
+                    yield ExpandEvent(cell=grid.cell(node), frontier=[])
+                jump_points = Pathfinding._build_path(grid, parents, start_node, node)
+                state.release()
+                yield PathEvent(path=Pathfinding._expand_jumps(grid, jump_points))
+                return
+
+            # only jump points are queued, the cells in between are skipped
+            frontier = []
+            row, col = divmod(node, stride)
+            for dx, dy in Pathfinding._jump_directions(cells, stride, node, parents[node], diagonal):
+                jump_node = Pathfinding._jump(cells, stride, node, dx, dy, goal_node, diagonal)
+                if jump_node < 0 or mark[jump_node] == closed:
+                    continue
+
+                jump_row, jump_col = divmod(jump_node, stride)
+                child_g = best_g[node] + Pathfinding._distance((row, col), (jump_row, jump_col), diagonal)
+                if mark[jump_node] == opened and best_g[jump_node] <= child_g:
+                    continue
+                mark[jump_node] = opened
+                best_g[jump_node] = child_g
+                parents[jump_node] = node
+
+                child_h = Pathfinding._distance((jump_row, jump_col), (goal_row, goal_col), diagonal)
+                heappush(open_list, (child_g + child_h, child_h, jump_node))
+                if stats is not None:
+                    stats.pushes += 1
+                if trace:
+                    frontier.append(grid.cell(jump_node))
+
+            if trace:
+                yield ExpandEvent(cell=grid.cell(node), frontier=frontier)
+
+        state.release()
+        yield PathEvent(path=[])
+
+    @staticmethod
+    def iter_dijkstra(grid:Grid, start:int, goal:int, trace:bool=True, stats:SearchStats=None) -> Iterator[SearchEvent]:
+        cells = grid.cells
+        costs = grid.costs
+        start_node = grid.node(start)
+        goal_node = grid.node(goal)
+
+        # no path can start or end in a wall
+        if cells[start_node] or cells[goal_node]:
+            yield PathEvent(path=[])
+            return
+
+        # dial's algorithm: integer costs up to max_cost fit in a ring of max_cost + 1 buckets,
+        # bucket d % len(buckets) holds the nodes at distance d, so push and pop are O(1)
+        buckets = [[] for _ in range(grid.cost_range()[1] + 1)]
+        # per node arrays come from the shared pool, stamps tell this search's nodes from older ones
+        state = SearchState.acquire(len(cells))
+        dist, parents, mark = state.g, state.parents, state.mark
+        opened = state.generation
+        closed = opened + 1
+        dist[start_node] = 0
+        mark[start_node] = opened
+        buckets[0].append(start_node)
+        queued = 1
+        current = 0
+
+        while queued:
+            bucket = buckets[current % len(buckets)]
+            while bucket:
+                node = bucket.pop()
+                queued -= 1
+                if stats is not None:
+                    stats.pops += 1
+
+                # a node is queued again when its distance drops, the old entry is stale
+                if mark[node] == closed or dist[node] != current:
+                    continue
+                mark[node] = closed
+                if stats is not None:
+                    stats.expand(grid.cell(node), queued)
+
+                # found goal
+                if node == goal_node:
+                    if trace:
+                        yield ExpandEvent(cell=grid.cell(node), frontier=[])
+                    path = Pathfinding._build_path(grid, parents, start_node, node)
+                    state.release()
+                    yield PathEvent(path=path)
+                    return
+
+                frontier = []
+                for offset in grid.offsets:
+                    child = node + offset
+                    if cells[child] or mark[child] == closed:
+                        continue
+                    child_dist = current + (1 if costs is None else costs[child])
+                    if mark[child] == opened and dist[child] <= child_dist:
+                        continue
+                    mark[child] = opened
+                    dist[child] = child_dist
+                    parents[child] = node
+                    buckets[child_dist % len(buckets)].append(child)
+                    queued += 1
+                    if stats is not None:
+                        stats.pushes += 1
+                    if trace:
+                        frontier.append(grid.cell(child))
+
+                if trace:
+                    yield ExpandEvent(cell=grid.cell(node), frontier=frontier)
+            current += 1
+
+        state.release()
+        yield PathEvent(path=[])
+
+    @staticmethod
+    def iter_bidirectional_breadth_first(grid:Grid, start:int, goal:int, trace:bool=True, stats:SearchStats=None) -> Iterator[SearchEvent]:
+        Pathfinding._check_uniform(grid, "bidirectional BFS")
+        cells = grid.cells
+        start_node = grid.node(start)
+        goal_node = grid.node(goal)
+
+        # no path can start or end in a wall
+        if cells[start_node] or cells[goal_node]:
+            yield PathEvent(path=[])
+            return
+
+        if start_node == goal_node:
+            if trace:
+                yield ExpandEvent(cell=start, frontier=[])
+            yield PathEvent(path=[start])
+            return
+
+        # index 0 searches forward from the start, index 1 backward from the goal, each with its own pooled state
+        states = (SearchState.acquire(len(cells)), SearchState.acquire(len(cells)))
+        dists = (states[0].g, states[1].g)
+        parents = (states[0].parents, states[1].parents)
+        marks = (states[0].mark, states[1].mark)
+        reached = (states[0].generation, states[1].generation)
+        dists[0][start_node] = 0
+        dists[1][goal_node] = 0
+        marks[0][start_node] = reached[0]
+        marks[1][goal_node] = reached[1]
+        layers = [[start_node], [goal_node]]
+
+        while layers[0] and layers[1]:
+            # grow the smaller side by one whole layer
+            side = 0 if len(layers[0]) <= len(layers[1]) else 1
+            dist = dists[side]
+            other_dist = dists[1 - side]
+            parent = parents[side]
+            mark, side_reached = marks[side], reached[side]
+            other_mark, other_reached = marks[1 - side], reached[1 - side]
+
+            # every crossing found in this layer is compared, the first one is not always the shortest
+            best_length = -1
+            meeting = None
+            next_layer = []
+            for node in layers[side]:
+                if stats is not None:
+                    stats.pops += 1
+                    stats.expand(grid.cell(node), len(layers[0]) + len(layers[1]) + len(next_layer))
+                frontier = []
+                child_dist = dist[node] + 1
+                for offset in grid.offsets:
+                    child = node + offset
+                    if cells[child]:
+                        continue
+                    if other_mark[child] == other_reached:
+                        if best_length == -1 or child_dist + other_dist[child] < best_length:
+                            best_length = child_dist + other_dist[child]
+                            meeting = (node, child) if side == 0 else (child, node)
+                        continue
+                    if mark[child] == side_reached:
+                        continue
+                    mark[child] = side_reached
+                    dist[child] = child_dist
+                    parent[child] = node
+                    next_layer.append(child)
+                    if stats is not None:
+                        stats.pushes += 1
+                    if trace:
+                        frontier.append(grid.cell(child))
+
+                if trace:
+                    yield ExpandEvent(cell=grid.cell(node), frontier=frontier)
+
+            if meeting is not None:
+                path = Pathfinding._join_paths(grid, parents, start_node, goal_node, *meeting)
+                states[0].release()
+                states[1].release()
+                yield PathEvent(path=path)
+                return
+            layers[side] = next_layer
+
+        states[0].release()
+        states[1].release()
+        yield PathEvent(path=[])
+
+    @staticmethod
+    def iter_bidirectional_a_star(grid:Grid, start:int, goal:int, trace:bool=True, diagonal:bool=False, stats:SearchStats=None) -> Iterator[SearchEvent]:
+        cells = grid.cells
+        stride = grid.stride
+        start_node = grid.node(start)
+        goal_node = grid.node(goal)
+
+        # no path can start or end in a wall
+        if cells[start_node] or cells[goal_node]:
+            yield PathEvent(path=[])
+            return
+
+        start_row, start_col = divmod(start_node, stride)
+        goal_row, goal_col = divmod(goal_node, stride)
+
+        # entering a cell costs its terrain cost: the forward search pays for the child it steps on,
+        # the backward search walks the moves in reverse and pays for the node it comes from
+        costs = grid.costs
+        min_cost = grid.cost_range()[0]
+
+        # distances to the goal and to the start scaled by the cheapest cell, the forward and backward heuristics
+        def heuristics(node:int) -> tuple[float, float]:
+            row, col = divmod(node, stride)
+            return (Pathfinding._distance((row, col), (goal_row, goal_col), diagonal) * min_cost,
+                    Pathfinding._distance((row, col), (start_row, start_col), diagonal) * min_cost)
+
+        # both sides share one potential, half the forward heuristic minus half the backward one.
+        # forward keys are g + potential and backward keys g - potential, so the searches can stop
+        # as soon as the two smallest keys add up to the best path found.
+        # the halved heuristics order the nodes more loosely than iter_a_star does: this wins on mazes and
+        # terrain, where both sides get stuck less, and loses on open and random maps
+        def potential(node:int) -> float:
+            to_goal, to_start = heuristics(node)
+            return (to_goal - to_start) / 2
+
+        # index 0 searches forward from the start, index 1 backward from the goal, each with its own pooled state
+        states = (SearchState.acquire(len(cells)), SearchState.acquire(len(cells)))
+        best_g = (states[0].g, states[1].g)
+        parents = (states[0].parents, states[1].parents)
+        marks = (states[0].mark, states[1].mark)
+        opened = (states[0].generation, states[1].generation)
+        moves = grid.moves + grid.diagonal_moves if diagonal else grid.moves
+
+        # open lists are heaps of (key, -g, node), ties go to the deeper node like h does in iter_a_star
+        open_lists = ([(potential(start_node), 0, start_node)], [(-potential(goal_node), 0, goal_node)])
+        best_g[0][start_node] = 0
+        best_g[1][goal_node] = 0
+        marks[0][start_node] = opened[0]
+        marks[1][goal_node] = opened[1]
+
+        # cheapest start to goal cost seen where the two searches touch
+        best_cost = 0 if start_node == goal_node else float("inf")
+        meeting = start_node if start_node == goal_node else -1
+
+        while open_lists[0] and open_lists[1]:
+            if open_lists[0][0][0] + open_lists[1][0][0] >= best_cost:
                 break
 
-        return result
\ No newline at end of file
+            # expand the side with fewer open nodes
+            side = 0 if len(open_lists[0]) <= len(open_lists[1]) else 1
+            sign = 1 if side == 0 else -1
+            open_list = open_lists[side]
+            side_g = best_g[side]
+            other_g = best_g[1 - side]
+            mark, side_opened = marks[side], opened[side]
+            other_mark, other_opened = marks[1 - side], opened[1 - side]
+            side_closed = side_opened + 1
+            parent = parents[side]
+
+            _, _, node = heappop(open_list)
+            if stats is not None:
+                stats.pops += 1
+            if mark[node] == side_closed:
+                continue
+            mark[node] = side_closed
+
+            # the full heuristic of this side proves the node cannot lead to a cheaper path anymore
+            node_g = side_g[node]
+            if node_g + heuristics(node)[side] >= best_cost:
+                continue
+            if stats is not None:
+                stats.expand(grid.cell(node), len(open_lists[0]) + len(open_lists[1]))
+
+            frontier = []
+            for offset, cost, corner_a, corner_b in moves:
+                child = node + offset
+                if cells[child] or mark[child] == side_closed:
+                    continue
+                if corner_a and (cells[node + corner_a] or cells[node + corner_b]):
+                    continue
+
+                if costs is not None:
+                    cost *= costs[child] if side == 0 else costs[node]
+                child_g = node_g + cost
+                if mark[child] == side_opened and side_g[child] <= child_g:
+                    continue
+                mark[child] = side_opened
+                side_g[child] = child_g
+                parent[child] = node
+
+                # the other search already reached this cell, a full path goes through it
+                if other_mark[child] >= other_opened and child_g + other_g[child] < best_cost:
+                    best_cost = child_g + other_g[child]
+                    meeting = child
+
+                to_goal, to_start = heuristics(child)
+                if child_g + (to_goal if side == 0 else to_start) >= best_cost:
+                    continue
+                heappush(open_list, (child_g + sign * (to_goal - to_start) / 2, -child_g, child))
+                if stats is not None:
+                    stats.pushes += 1
+                if trace:
+                    frontier.append(grid.cell(child))
+
+            if trace:
+                yield ExpandEvent(cell=grid.cell(node), frontier=frontier)
+
+        path = [] if meeting == -1 else Pathfinding._join_paths(grid, parents, start_node, goal_node, meeting, meeting)
+        states[0].release()
+        states[1].release()
+        yield PathEvent(path=path)
+
+    @staticmethod
+    def a_star(grid:Grid, start:int, goal:int, heuristic:Callable[[int], int]=None, diagonal:bool=False, stats:SearchStats=None) -> list[int]:
+        return Pathfinding.find_path(Pathfinding.iter_a_star(grid, start, goal, trace=False, heuristic=heuristic, diagonal=diagonal, stats=stats), stats)
+
+    @staticmethod
+    def jump_point(grid:Grid, start:int, goal:int, diagonal:bool=False, stats:SearchStats=None) -> list[int]:
+        return Pathfinding.find_path(Pathfinding.iter_jump_point(grid, start, goal, trace=False, diagonal=diagonal, stats=stats), stats)
+
+    @staticmethod
+    def depth_first(grid:Grid, start:int, goal:int, stats:SearchStats=None) -> list[int]:
+        return Pathfinding.find_path(Pathfinding.iter_depth_first(grid, start, goal, trace=False, stats=stats), stats)
+
+    @staticmethod
+    def breadth_first(grid:Grid, start:int, goal:int, stats:SearchStats=None) -> list[int]:
+        return Pathfinding.find_path(Pathfinding.iter_breadth_first(grid, start, goal, trace=False, stats=stats), stats)
+
+    @staticmethod
+    def dijkstra(grid:Grid, start:int, goal:int, stats:SearchStats=None) -> list[int]:
+        return Pathfinding.find_path(Pathfinding.iter_dijkstra(grid, start, goal, trace=False, stats=stats), stats)
+
+    @staticmethod
+    def bidirectional_breadth_first(grid:Grid, start:int, goal:int, stats:SearchStats=None) -> list[int]:
+        return Pathfinding.find_path(Pathfinding.iter_bidirectional_breadth_first(grid, start, goal, trace=False, stats=stats), stats)
+
+    @staticmethod
+    def bidirectional_a_star(grid:Grid, start:int, goal:int, diagonal:bool=False, stats:SearchStats=None) -> list[int]:
+        return Pathfinding.find_path(Pathfinding.iter_bidirectional_a_star(grid, start, goal, trace=False, diagonal=diagonal, stats=stats), stats)
+
+    @staticmethod
+    def find_path(events:Iterator[SearchEvent], stats:SearchStats=None) -> list[int]:
+        # run a search generator to the end and return its path
+        if stats is not None:
+            events = Pathfinding.measure(events, stats)
+        for event in events:
+            if type(event) == PathEvent:
+                return event.path
+        return []
+
+    @staticmethod
+    def measure(events:Iterator[SearchEvent], stats:SearchStats) -> Iterator[SearchEvent]:
+        # times only the search itself, the clock stops while the caller handles each event
+        tracing = stats.track_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if stats.track_memory:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+        try:
+            while True:
+                start_time = perf_counter()
+                event = next(events, None)
+                stats.elapsed += perf_counter() - start_time
+                if event is None:
+                    return
+                if type(event) == PathEvent:
+                    stats.path_length = len(event.path)
+                    if stats.track_memory:
+                        stats.memory_peak = max(stats.memory_peak, tracemalloc.get_traced_memory()[1] - baseline)
+                yield event
+        finally:
+            if tracing:
+                tracemalloc.stop()
+
+    @staticmethod
+    def path_cost(grid:Grid, path:list[int]) -> float:
+        # straight steps cost 1 and diagonal steps cost sqrt(2), times the terrain cost of the cell entered
+        cost = 0
+        for cell, next_cell in zip(path, path[1:]):
+            row, col = divmod(cell, grid.width)
+            next_row, next_col = divmod(next_cell, grid.width)
+            cost += (Grid.DIAGONAL_COST if row != next_row and col != next_col else 1) * grid.cost(next_cell)
+        return cost
+
+    @staticmethod
+    def _check_uniform(grid:Grid, name:str) -> None:
+        # searches that count steps would return paths that look shortest but are not once cells cost more
+        if grid.cost_range()[1] > 1:
+            raise ValueError(f"{name} ignores terrain costs, use A*, Dijkstra or bidirectional A* on this grid")
+
+    @staticmethod
+    def _octile_to(grid:Grid, goal_node:int) -> Callable[[int], float]:
+        goal_row, goal_col = divmod(goal_node, grid.stride)
+
+        def heuristic(node:int) -> float:
+            row, col = divmod(node, grid.stride)
+            return Pathfinding._distance((row, col), (goal_row, goal_col), True)
+
+        return heuristic
+
+    @staticmethod
+    def _distance(a:tuple[int, int], b:tuple[int, int], diagonal:bool) -> float:
+        dy = abs(a[0] - b[0])
+        dx = abs(a[1] - b[1])
+        if not diagonal:
+            return dx + dy
+        return max(dx, dy) + (Grid.DIAGONAL_COST - 1) * min(dx, dy)
+
+    @staticmethod
+    def _jump_directions(cells:bytearray, stride:int, node:int, parent:int, diagonal:bool) -> list[tuple[int, int]]:
+        def free(dx:int, dy:int) -> bool:
+            return not cells[node + dx + dy * stride]
+
+        # start node: every open direction
+        if parent == node:
+            result = [(dx, dy) for dx, dy in ((1, 0), (-1, 0), (0, -1), (0, 1)) if free(dx, dy)]
+            if diagonal:
+                result += [(dx, dy) for dx in (1, -1) for dy in (-1, 1) if free(dx, 0) and free(0, dy)]
+            return result
+
+        # prune to the natural and forced neighbours of the direction we arrived from
+        parent_row, parent_col = divmod(parent, stride)
+        row, col = divmod(node, stride)
+        dx = (col > parent_col) - (col < parent_col)
+        dy = (row > parent_row) - (row < parent_row)
+
+        if not diagonal:
+            if dx:
+                candidates = ((0, -1), (0, 1), (dx, 0))
+            else:
+                candidates = ((-1, 0), (1, 0), (0, dy))
+            return [(cx, cy) for cx, cy in candidates if free(cx, cy)]
+
+        result = []
+        if dx and dy:
+            if free(0, dy):
+                result.append((0, dy))
+            if free(dx, 0):
+                result.append((dx, 0))
+            if free(0, dy) and free(dx, 0):
+                result.append((dx, dy))
+        elif dx:
+            ahead, below, above = free(dx, 0), free(0, 1), free(0, -1)
+            if ahead:
+                result.append((dx, 0))
+                if below:
+                    result.append((dx, 1))
+                if above:
+                    result.append((dx, -1))
+            if below:
+                result.append((0, 1))
+            if above:
+                result.append((0, -1))
+        else:
+            ahead, right, left = free(0, dy), free(1, 0), free(-1, 0)
+            if ahead:
+                result.append((0, dy))
+                if right:
+                    result.append((1, dy))
+                if left:
+                    result.append((-1, dy))
+            if right:
+                result.append((1, 0))
+            if left:
+                result.append((-1, 0))
+        return result
+
+    @staticmethod
+    def _jump(cells:bytearray, stride:int, node:int, dx:int, dy:int, goal_node:int, diagonal:bool) -> int:
+        # walk in one direction until a jump point or the goal, -1 if a wall comes first
+        if dx and dy:
+            step = dx + dy * stride
+            while True:
+                node += step
+                if cells[node]:
+                    return -1
+                if node == goal_node:
+                    return node
+
+                # moving diagonally: stop where a straight jump finds something
+                if Pathfinding._jump(cells, stride, node, dx, 0, goal_node, diagonal) >= 0:
+                    return node
+                if Pathfinding._jump(cells, stride, node, 0, dy, goal_node, diagonal) >= 0:
+                    return node
+                if cells[node + dx] or cells[node + dy * stride]:
+                    return -1
+
+        # straight runs are scanned on copies of the row or column and its two neighbours,
+        # bytes() also gives find() to cells that are a plain memoryview
+        if dx:
+            row_start = node - node % stride
+            goal_pos = goal_node - row_start if 0 <= goal_node - row_start < stride else -1
+            pos = Pathfinding._scan(bytes(cells[row_start:row_start + stride]), bytes(cells[row_start - stride:row_start]),
+                                    bytes(cells[row_start + stride:row_start + 2 * stride]), node - row_start, dx, goal_pos)
+            return row_start + pos if pos >= 0 else -1
+
+        col = node % stride
+        line = bytes(cells[col::stride])
+        goal_pos = goal_node // stride if goal_node % stride == col else -1
+        pos = Pathfinding._scan(line, bytes(cells[col - 1::stride]), bytes(cells[col + 1::stride]), node // stride, dy, goal_pos)
+        if diagonal:
+            return pos * stride + col if pos >= 0 else -1
+
+        # without diagonal moves, every cell of a vertical run may hold a horizontal jump point
+        end = pos if pos >= 0 else (line.find(Grid.WALL, node // stride) if dy > 0 else line.rfind(Grid.WALL, 0, node // stride))
+        for row in range(node // stride + dy, end, dy):
+            row_node = row * stride + col
+            if Pathfinding._jump(cells, stride, row_node, 1, 0, goal_node, diagonal) >= 0:
+                return row_node
+            if Pathfinding._jump(cells, stride, row_node, -1, 0, goal_node, diagonal) >= 0:
+                return row_node
+        return pos * stride + col if pos >= 0 else -1
+
+    @staticmethod
+    def _scan(line:bytes, side_a:bytes, side_b:bytes, pos:int, step:int, goal_pos:int) -> int:
+        # first position after pos that is the goal or has a forced neighbour: a side cell that
+        # is free while the side cell one step back is a wall, -1 if the line hits a wall first
+        result = -1
+        if step > 0:
+            end = line.find(Grid.WALL, pos + 1)
+            if pos < goal_pos < end:
+                result = goal_pos
+            for side in (side_a, side_b):
+                found = side.find(b"\x01\x00", pos, end)
+                if found >= 0 and (result < 0 or found + 1 < result):
+                    result = found + 1
+        else:
+            end = line.rfind(Grid.WALL, 0, pos)
+            if end < goal_pos < pos:
+                result = goal_pos
+            for side in (side_a, side_b):
+                found = side.rfind(b"\x00\x01", end + 1, pos + 1)
+                if found > result:
+                    result = found
+        return result
+
+    @staticmethod
+    def _expand_jumps(grid:Grid, jump_points:list[int]) -> list[int]:
+        result = jump_points[:1]
+        for cell, next_cell in zip(jump_points, jump_points[1:]):
+            row, col = divmod(cell, grid.width)
+            next_row, next_col = divmod(next_cell, grid.width)
+            step = ((next_col > col) - (next_col < col)) + ((next_row > row) - (next_row < row)) * grid.width
+            while cell != next_cell:
+                cell += step
+                result.append(cell)
+        return result
+
+    @staticmethod
+    def _build_path(grid:Grid, parents:list[int], start_node:int, node:int) -> list[int]:
+        result = [grid.cell(node)]
+        while node != start_node:
+            node = parents[node]
+            result.append(grid.cell(node))
+
+        # reverse path
+        return result[::-1]
+
+    @staticmethod
+    def _join_paths(grid:Grid, parents:tuple[list[int], list[int]], start_node:int, goal_node:int, forward_node:int, backward_node:int) -> list[int]:
+        # start -> forward_node from the forward tree, then backward_node -> goal from the backward tree
+        forward = Pathfinding._build_path(grid, parents[0], start_node, forward_node)
+        backward = Pathfinding._build_path(grid, parents[1], goal_node, backward_node)[::-1]
+        if forward_node == backward_node:
+            backward = backward[1:]
+        return forward + backward
+
+    # adapters for the original interface of 1-based canvas ids in a square grid
+    @staticmethod
+    def search_a_star(start_index:int, end_index:int, arr_size:int, blacklist:list[int]) -> list[int]:
+        grid = Grid.from_blacklist(arr_size, blacklist)
+        return [cell + 1 for cell in Pathfinding.a_star(grid, start_index - 1, end_index - 1)]
+
+    @staticmethod
+    def search_depth(start_index:int, end_index:int, arr_size:int, blacklist:list[int]) -> list[int]:
+        grid = Grid.from_blacklist(arr_size, blacklist)
+        return [cell + 1 for cell in Pathfinding.depth_first(grid, start_index - 1, end_index - 1)]
+
+    @staticmethod
+    def search_breadth(start_index:int, end_index:int, arr_size:int, blacklist:list[int]) -> list[int]:
+        grid = Grid.from_blacklist(arr_size, blacklist)
+        return [cell + 1 for cell in Pathfinding.breadth_first(grid, start_index - 1, end_index - 1)]
+
+# plain search functions by name, for callers that pick the algorithm at runtime
+ALGORITHMS = {
+    "A*": Pathfinding.a_star,
+    "A* 8-way": lambda grid, start, goal, stats=None: Pathfinding.a_star(grid, start, goal, diagonal=True, stats=stats),
+    "BFS": Pathfinding.breadth_first,
+    "Bidirectional A*": Pathfinding.bidirectional_a_star,
+    "Bidirectional A* 8-way": lambda grid, start, goal, stats=None: Pathfinding.bidirectional_a_star(grid, start, goal, diagonal=True, stats=stats),
+    "Bidirectional BFS": Pathfinding.bidirectional_breadth_first,
+    "DFS": Pathfinding.depth_first,
+    "Dijkstra": Pathfinding.dijkstra,
+    "JPS": Pathfinding.jump_point,
+    "JPS 8-way": lambda grid, start, goal, stats=None: Pathfinding.jump_point(grid, start, goal, diagonal=True, stats=stats),
+}
+
+if __name__ == "__main__":
+    # python -m pathfinding runs the headless batch solver
+    import sys
+    from headless import main
+    sys.exit(main())
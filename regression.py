@@ -0,0 +1,358 @@
+import argparse
+import json
+import os
+import platform
+import sys
+from collections import deque
+from heapq import heappop, heappush
+from time import perf_counter, sleep
+
+from benchmark import maze_grid, open_grid, place_agents, random_grid, random_queries, run_agents, terrain_grid
+from cooperative import CooperativePlanner
+from pathfinding import ALGORITHMS, Grid, Pathfinding, SearchState, SearchStats
+
+SIZES = (32, 128, 512, 2048)
+MAPS = {
+    "random": lambda size: random_grid(size, size, 0.2, seed=size),
+    "maze": lambda size: maze_grid(size, size, seed=size),
+    "open": lambda size: open_grid(size, size, seed=size),
+    "terrain": lambda size: terrain_grid(size, size, seed=size),
+}
+
+# searches that return any path, only checked for being a valid one
+NOT_SHORTEST = {"DFS"}
+
+# searches that count steps, on maps with terrain costs they must refuse instead of being timed
+UNIFORM_ONLY = {"BFS", "Bidirectional BFS", "JPS", "JPS 8-way"}
+
+# the legacy 1-based square grid adapters, checked for correctness up to this size but not timed
+LEGACY_ADAPTERS = {"search_a_star": True, "search_breadth": True, "search_depth": False}
+LEGACY_MAX_SIZE = 512
+
+# fixed cooperative scenario: agents on a map side, all of them must arrive within the ticks without colliding
+COOPERATIVE_AGENTS = 100
+COOPERATIVE_SIZE = 64
+COOPERATIVE_TICKS = 1000
+
+# a regression must also be larger than this, timings of tiny searches are mostly noise
+METRICS = {"elapsed": 0.0005, "expanded": 0, "memory_peak": 1024}
+
+# a query is timed again while it ran for less than this, longer searches are steady enough
+REPEAT_BELOW = 0.05
+
+# timings still scatter around their calibration, a result slower than the baseline allows
+# is timed again after a pause up to this many times before it counts as a regression
+RETIMES = 10
+RETIME_PAUSE = 1.0
+
+def calibrate(rounds:int=5) -> float:
+    # seconds for a plain breadth first search over an open 128x128 map. it walks per node lists like the
+    # searches do, so a busy machine slows it down the same way, and every timing is scaled by one taken next to it
+    side = 128
+    stride = side + 2
+    free = [0 < node % stride <= side and stride <= node < stride * (side + 1) for node in range(stride * (side + 2))]
+    best = None
+    for _ in range(rounds):
+        start_time = perf_counter()
+        parents = [-1] * len(free)
+        source = stride + 1
+        parents[source] = source
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for child in (node + 1, node - 1, node + stride, node - stride):
+                if free[child] and parents[child] == -1:
+                    parents[child] = node
+                    queue.append(child)
+        elapsed = perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def query_count(size:int) -> int:
+    # fewer queries on larger maps, every query there takes seconds
+    return max(2, 1600 // size)
+
+def reference_cost(grid:Grid, start:int, goal:int, diagonal:bool=False) -> float:
+    # deliberately plain searches over (x, y) cells to compare the fast ones against, -1 if unreachable.
+    # breadth first search for 4-way moves on unit cost maps, otherwise uniform cost search where
+    # a step costs the terrain cost of the cell it enters and 8-way moves cannot cut corners
+    if grid.is_wall(start) or grid.is_wall(goal):
+        return -1
+    width, height = grid.width, grid.height
+
+    def free(x:int, y:int) -> bool:
+        return 0 <= x < width and 0 <= y < height and not grid.is_wall(y * width + x)
+
+    if not diagonal and grid.costs is None:
+        dist = {start: 0}
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            if cell == goal:
+                return dist[cell]
+            y, x = divmod(cell, width)
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if free(nx, ny) and ny * width + nx not in dist:
+                    dist[ny * width + nx] = dist[cell] + 1
+                    queue.append(ny * width + nx)
+        return -1
+
+    dist = {start: 0}
+    open_list = [(0, start)]
+    done = set()
+    while open_list:
+        cost, cell = heappop(open_list)
+        if cell in done:
+            continue
+        done.add(cell)
+        if cell == goal:
+            return cost
+        y, x = divmod(cell, width)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                if dx and dy and not diagonal:
+                    continue
+                if (dx or dy) and free(x + dx, y + dy) and (not (dx and dy) or (free(x + dx, y) and free(x, y + dy))):
+                    child = (y + dy) * width + x + dx
+                    child_cost = cost + (Grid.DIAGONAL_COST if dx and dy else 1) * grid.cost(child)
+                    if child_cost < dist.get(child, child_cost + 1):
+                        dist[child] = child_cost
+                        heappush(open_list, (child_cost, child))
+    return -1
+
+def check_path(grid:Grid, path:list[int], start:int, goal:int, diagonal:bool, optimal_cost:float, shortest:bool) -> str:
+    # None for a good path, otherwise what is wrong with it
+    if optimal_cost == -1:
+        return None if not path else "found a path where there is none"
+    if not path:
+        return "found no path"
+    if path[0] != start or path[-1] != goal:
+        return f"path runs from {path[0]} to {path[-1]}"
+
+    width = grid.width
+    for cell, next_cell in zip(path, path[1:]):
+        y, x = divmod(cell, width)
+        next_y, next_x = divmod(next_cell, width)
+        dx, dy = next_x - x, next_y - y
+        if grid.is_wall(next_cell) or max(abs(dx), abs(dy)) != 1 or (dx and dy and not diagonal):
+            return f"bad step {cell} -> {next_cell}"
+        if dx and dy and (grid.is_wall(y * width + next_x) or grid.is_wall(next_y * width + x)):
+            return f"step {cell} -> {next_cell} cuts a corner"
+
+    cost = Pathfinding.path_cost(grid, path)
+    if shortest and abs(cost - optimal_cost) > 1e-6:
+        return f"cost {cost:.6f}, reference {optimal_cost:.6f}"
+    return None
+
+def time_query(grid:Grid, name:str, start:int, goal:int, repeats:int) -> tuple[float, SearchStats, list[int]]:
+    # best of a few runs against noise, the pool is warm after the first one
+    search = ALGORITHMS[name]
+    best = None
+    for _ in range(repeats):
+        stats = SearchStats()
+        path = search(grid, start, goal, stats=stats)
+        best = stats.elapsed if best is None else min(best, stats.elapsed)
+        if stats.elapsed >= REPEAT_BELOW:
+            break
+    return best, stats, path
+
+def measure_algorithm(grid:Grid, name:str, queries:list[tuple[int, int]], references:list[float], repeats:int) -> tuple[dict, list[str]]:
+    search = ALGORITHMS[name]
+    diagonal = "8-way" in name
+    elapsed = expanded = memory_peak = 0
+    failures = []
+    for index, ((start, goal), optimal_cost) in enumerate(zip(queries, references)):
+        best, stats, path = time_query(grid, name, start, goal, repeats)
+        elapsed += best
+        expanded += stats.expanded
+
+        problem = check_path(grid, path, start, goal, diagonal, optimal_cost, name not in NOT_SHORTEST)
+        if problem is not None:
+            failures.append(f"{name} {start} -> {goal}: {problem}")
+
+        # memory of a cold search, including the pooled per node arrays it has to create.
+        # tracemalloc slows the search several times over, one query per map is enough
+        if index == 0:
+            SearchState.clear_pool()
+            stats = SearchStats(track_memory=True)
+            search(grid, start, goal, stats=stats)
+            memory_peak = stats.memory_peak
+
+    count = max(len(queries), 1)
+    return {"elapsed": elapsed / count, "expanded": expanded / count, "memory_peak": memory_peak, "queries": len(queries)}, failures
+
+def check_refuses_costs(grid:Grid, name:str, query:tuple[int, int]) -> list[str]:
+    # a search that counts steps returns paths that only look shortest on terrain, it has to raise instead
+    try:
+        ALGORITHMS[name](grid, *query)
+    except ValueError:
+        return []
+    return [f"{name} {query[0]} -> {query[1]}: searched a map with terrain costs instead of refusing it"]
+
+def check_legacy(grid:Grid, queries:list[tuple[int, int]], references:list[float]) -> list[str]:
+    # the old entry points take 1-based canvas ids and a list of wall ids on a square map
+    blacklist = [cell + 1 for cell in range(grid.width * grid.height) if grid.is_wall(cell)]
+    failures = []
+    for name, shortest in LEGACY_ADAPTERS.items():
+        search = getattr(Pathfinding, name)
+        for (start, goal), optimal_cost in zip(queries, references):
+            path = [rect - 1 for rect in search(start + 1, goal + 1, grid.width * grid.height, blacklist)]
+            problem = check_path(grid, path, start, goal, False, optimal_cost, shortest)
+            if problem is not None:
+                failures.append(f"{name} {start} -> {goal}: {problem}")
+    return failures
+
+def check_cooperative() -> list[str]:
+    grid = random_grid(COOPERATIVE_SIZE, COOPERATIVE_SIZE, 0.1, seed=COOPERATIVE_SIZE)
+    planner = CooperativePlanner(grid)
+    place_agents(planner, grid, COOPERATIVE_AGENTS, seed=COOPERATIVE_AGENTS)
+    _, _, collisions = run_agents(planner, COOPERATIVE_TICKS)
+    failures = []
+    if collisions:
+        failures.append(f"{collisions} collisions")
+    if not planner.done():
+        failures.append(f"{len(planner.positions) - sum(planner.arrived)} of {len(planner.positions)} agents did not arrive in {COOPERATIVE_TICKS} ticks")
+    print(f"cooperative {COOPERATIVE_SIZE}x{COOPERATIVE_SIZE} {len(planner.positions)} agents: {planner.tick} ticks"
+          + (f", {', '.join(failures)}" if failures else ""), flush=True)
+    return [f"cooperative {COOPERATIVE_SIZE}x{COOPERATIVE_SIZE} {failure}" for failure in failures]
+
+def run_suite(sizes:list[int], algorithms:list[str], repeats:int=3, maps:list[str]=None) -> tuple[dict, list[str]]:
+    # results by "algorithm/map/size" and every path that did not match the reference.
+    # a shared machine switches between a fast and a slow speed for half a minute or more at a time,
+    # every result keeps the calibration measured around it so it is compared at the speed it ran at
+    results = {}
+    failures = []
+    for size in sizes:
+        for kind in maps or MAPS:
+            grid = MAPS[kind](size)
+            queries = random_queries(grid, query_count(size), seed=size)
+            references = {False: [reference_cost(grid, start, goal) for start, goal in queries]}
+            if any("8-way" in name for name in algorithms):
+                references[True] = [reference_cost(grid, start, goal, diagonal=True) for start, goal in queries]
+
+            for name in algorithms:
+                if grid.costs is not None and name in UNIFORM_ONLY:
+                    problems = check_refuses_costs(grid, name, queries[0])
+                    failures.extend(f"{kind} {size}x{size} {problem}" for problem in problems)
+                    continue
+                calibration = calibrate()
+                result, problems = measure_algorithm(grid, name, queries, references["8-way" in name], repeats)
+                result["calibration"] = min(calibration, calibrate())
+                results[f"{name}/{kind}/{size}"] = result
+                failures.extend(f"{kind} {size}x{size} {problem}" for problem in problems)
+                print(f"{name} {kind} {size}x{size}: {result['elapsed'] * 1000:.2f} ms/query, "
+                      f"{result['expanded']:.0f} expanded/query, {result['memory_peak'] / 1024:.0f} KiB peak"
+                      + (f", {len(problems)} wrong paths" if problems else ""), flush=True)
+
+            # the legacy adapters take walls only
+            if size <= LEGACY_MAX_SIZE and grid.costs is None:
+                problems = check_legacy(grid, queries, references[False])
+                failures.extend(f"{kind} {size}x{size} {problem}" for problem in problems)
+            SearchState.clear_pool()
+    return results, failures
+
+def time_limit(old:dict, calibration:float, time_threshold:float) -> float:
+    # slowest search time per query that still passes at the machine speed given by calibration
+    return old["elapsed"] * calibration / old["calibration"] * (1 + time_threshold) + METRICS["elapsed"]
+
+def retime(report:dict, baseline:dict, time_threshold:float, repeats:int) -> None:
+    # results slower than the baseline allows are timed again on the same map and queries, each time
+    # with a fresh calibration around it, and the pass that ran fastest for its calibration is kept
+    for key, result in report["results"].items():
+        old = baseline["results"].get(key)
+        if old is None or result["elapsed"] <= time_limit(old, result["calibration"], time_threshold):
+            continue
+        name, kind, size = key.rsplit("/", 2)
+        grid = MAPS[kind](int(size))
+        queries = random_queries(grid, query_count(int(size)), seed=int(size))
+        for _ in range(RETIMES):
+            sleep(RETIME_PAUSE)
+            calibration = calibrate()
+            elapsed = sum(time_query(grid, name, start, goal, repeats)[0] for start, goal in queries) / len(queries)
+            calibration = min(calibration, calibrate())
+            if elapsed / calibration < result["elapsed"] / result["calibration"]:
+                result["elapsed"], result["calibration"] = elapsed, calibration
+            if result["elapsed"] <= time_limit(old, result["calibration"], time_threshold):
+                break
+        SearchState.clear_pool()
+
+def compare(report:dict, baseline:dict, threshold:float, time_threshold:float) -> list[str]:
+    # the suite can run on a subset of what the baseline holds, but every result needs a baseline entry.
+    # expanded nodes and memory are repeatable, wall time gets its own looser threshold and is scaled
+    # by the calibrations measured around the old and the new result
+    regressions = []
+    for key, result in report["results"].items():
+        old = baseline["results"].get(key)
+        if old is None:
+            regressions.append(f"{key}: not in the baseline, update it with --update")
+            continue
+        for metric, slack in METRICS.items():
+            old_value = old[metric] * result["calibration"] / old["calibration"] if metric == "elapsed" else old[metric]
+            allowed = time_threshold if metric == "elapsed" else threshold
+            if result[metric] > old_value * (1 + allowed) + slack:
+                change = (result[metric] / old_value - 1) * 100 if old_value else float("inf")
+                regressions.append(f"{key} {metric}: {old_value:.6g} -> {result[metric]:.6g} (+{change:.0f} %)")
+    return regressions
+
+def main(argv:list[str]=None) -> int:
+    parser = argparse.ArgumentParser(prog="python regression.py", description="Time every search on generated maps, check its paths against a reference search and compare with a saved baseline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="map sides, default 32 128 512 2048")
+    parser.add_argument("--maps", nargs="+", default=list(MAPS), choices=list(MAPS))
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS), choices=list(ALGORITHMS), metavar="ALGORITHM", help="names as in pathfinding.ALGORITHMS")
+    parser.add_argument("--baseline", default="benchmark_baseline.json", help="JSON file to compare with")
+    parser.add_argument("--update", action="store_true", help="write the baseline from this run instead of comparing with it")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative growth of expanded nodes and peak memory")
+    parser.add_argument("--time-threshold", type=float, default=0.5, help="allowed relative growth of the search time")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per query, the fastest counts")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    args = parser.parse_args(argv)
+
+    # without a baseline nothing would be compared, that must not pass as a clean run.
+    # it is read before the suite so a missing file or size fails in seconds instead of after an hour
+    baseline = None
+    if not args.update:
+        if not os.path.exists(args.baseline):
+            print(f"error: baseline {args.baseline} does not exist, write one with --update", file=sys.stderr)
+            return 2
+        try:
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+            if "results" not in baseline or any("calibration" not in result for result in baseline["results"].values()):
+                raise ValueError("not a baseline file")
+        except (OSError, ValueError) as error:
+            print(f"error: cannot read baseline {args.baseline}: {error}", file=sys.stderr)
+            return 2
+        missing = sorted(set(args.sizes) - {int(key.rsplit("/", 1)[1]) for key in baseline["results"]})
+        if missing:
+            print(f"error: baseline {args.baseline} has no results for sizes {' '.join(map(str, missing))}, "
+                  f"update it with --update", file=sys.stderr)
+            return 2
+
+    results, failures = run_suite(args.sizes, args.algorithms, max(args.repeats, 1), args.maps)
+    failures += check_cooperative()
+    report = {"python": platform.python_version(), "machine": platform.machine(), "results": results}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=1, sort_keys=True)
+
+    for failure in failures:
+        print(f"wrong path: {failure}", file=sys.stderr)
+
+    if args.update:
+        # a baseline is only worth keeping when every path was right
+        if failures:
+            return 1
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=1, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    retime(report, baseline, args.time_threshold, max(args.repeats, 1))
+    regressions = compare(report, baseline, args.threshold, args.time_threshold)
+    for regression in regressions:
+        print(f"regression: {regression}", file=sys.stderr)
+    print(f"{len(results)} results, {len(failures)} wrong paths, {len(regressions)} regressions")
+    return 1 if failures or regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
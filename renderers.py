@@ -0,0 +1,161 @@
+import tkinter as tk
+from math import ceil
+
+class RectangleRenderer:
+    def __init__(self, canvas:tk.Canvas, grid_width:int, grid_height:int, width:float, height:float) -> None:
+        self.canvas = canvas
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.rect_width = width / grid_width
+        self.rect_height = height / grid_height
+
+        # colors are mirrored here so reading a cell never asks Tcl
+        self.colors = ["white"] * (grid_width * grid_height)
+        self.rectid_arr = []
+
+        # create grid
+        for col in range(grid_height):
+            for row in range(grid_width):
+                rect_id = canvas.create_rectangle(self.rect_width * row, self.rect_height * col, self.rect_width * (row + 1), self.rect_height * (col + 1), fill="white", tags="cell")
+                self.rectid_arr.append(rect_id)
+
+    def fill(self, cell:int, color:str) -> None:
+        if self.colors[cell] != color:
+            self.colors[cell] = color
+            self.canvas.itemconfig(self.rectid_arr[cell], fill=color)
+
+    def color(self, cell:int) -> str:
+        return self.colors[cell]
+
+    def cell_at(self, x:float, y:float) -> int:
+        row = int(x // self.rect_width)
+        col = int(y // self.rect_height)
+        if 0 <= row < self.grid_width and 0 <= col < self.grid_height:
+            return col * self.grid_width + row
+        return None
+
+    def bounds(self, cell:int) -> tuple[float, float, float, float]:
+        col, row = divmod(cell, self.grid_width)
+        return self.rect_width * row, self.rect_height * col, self.rect_width * (row + 1), self.rect_height * (col + 1)
+
+    def resize(self, width:float, height:float) -> None:
+        scale_x = width / self.grid_width / self.rect_width
+        scale_y = height / self.grid_height / self.rect_height
+        self.rect_width = width / self.grid_width
+        self.rect_height = height / self.grid_height
+
+        # one scale call on the tag moves every rectangle inside Tk
+        self.canvas.scale("cell", 0, 0, scale_x, scale_y)
+
+    def flush(self) -> None:
+        # rectangles are updated as soon as they are filled
+        pass
+
+class RasterRenderer:
+    def __init__(self, canvas:tk.Canvas, grid_width:int, grid_height:int, width:float, height:float) -> None:
+        self.canvas = canvas
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.colors = ["white"] * (grid_width * grid_height)
+        self.dirty = {}
+        self.hex_colors = {}
+
+        # one pixel per cell, shown through a scaled copy that fills the canvas
+        self.image = tk.PhotoImage(width=grid_width, height=grid_height)
+        self.image.put(self._hex("white"), to=(0, 0, grid_width, grid_height))
+        self.view = tk.PhotoImage()
+        self.item = canvas.create_image(0, 0, anchor="nw", image=self.view)
+
+        self.zoom = 1
+        self.subsample = 1
+        self.resize(width, height)
+
+    def fill(self, cell:int, color:str) -> None:
+        if self.colors[cell] != color:
+            self.colors[cell] = color
+            self.dirty[cell] = color
+
+    def color(self, cell:int) -> str:
+        return self.colors[cell]
+
+    def cell_at(self, x:float, y:float) -> int:
+        row = int(x * self.subsample // self.zoom)
+        col = int(y * self.subsample // self.zoom)
+        if 0 <= row < self.grid_width and 0 <= col < self.grid_height:
+            return col * self.grid_width + row
+        return None
+
+    def bounds(self, cell:int) -> tuple[float, float, float, float]:
+        col, row = divmod(cell, self.grid_width)
+        size = self.zoom / self.subsample
+        return size * row, size * col, size * (row + 1), size * (col + 1)
+
+    def resize(self, width:float, height:float) -> None:
+        # integer zoom when cells are larger than a pixel, integer subsample when smaller
+        scale = min(width / self.grid_width, height / self.grid_height)
+        if scale >= 1:
+            zoom, subsample = int(scale), 1
+        else:
+            zoom, subsample = 1, ceil(1 / scale)
+
+        # most resize events keep the integer factors and need no redraw at all
+        if (zoom, subsample) == (self.zoom, self.subsample) and self.view.width():
+            return
+        self.zoom, self.subsample = zoom, subsample
+        self.flush()
+        self._copy_view()
+
+    def flush(self) -> None:
+        if not self.dirty:
+            return
+
+        # write dirty cells as horizontal runs, one put per run
+        runs = []
+        for cell in sorted(self.dirty):
+            if runs and runs[-1][1] == cell and cell % self.grid_width != 0:
+                runs[-1][1] = cell + 1
+                runs[-1][2].append(self._hex(self.dirty[cell]))
+            else:
+                runs.append([cell, cell + 1, [self._hex(self.dirty[cell])]])
+        self.dirty = {}
+
+        for first, _, colors in runs:
+            col, row = divmod(first, self.grid_width)
+            self.image.put("{" + " ".join(colors) + "}", to=(row, col))
+
+        # a few runs are scaled into the view in place, many at once by copying the whole image
+        if len(runs) > 64:
+            self._copy_view()
+            return
+        if self.subsample > 1:
+            self._copy_subsampled(runs)
+            return
+        for first, last, _ in runs:
+            col, row = divmod(first, self.grid_width)
+            self.view.tk.call(self.view, "copy", self.image, "-from", row, col, row + last - first, col + 1,
+                              "-to", row * self.zoom, col * self.zoom, "-zoom", self.zoom, self.zoom)
+
+    def _copy_subsampled(self, runs:list) -> None:
+        # the view only shows every subsample-th pixel of every subsample-th line, counted from 0.
+        # runs on other lines change nothing, the rest start copying at the next shown pixel
+        step = self.subsample
+        for first, last, _ in runs:
+            col, row = divmod(first, self.grid_width)
+            if col % step:
+                continue
+            start = -(-row // step) * step
+            end = row + last - first
+            if start >= end:
+                continue
+            self.view.tk.call(self.view, "copy", self.image, "-from", start, col, end, col + 1,
+                              "-to", start // step, col // step, "-subsample", step, step)
+
+    def _copy_view(self) -> None:
+        self.view.tk.call(self.view, "copy", self.image, "-shrink", "-zoom", self.zoom, self.zoom, "-subsample", self.subsample, self.subsample)
+
+    def _hex(self, color:str) -> str:
+        # photo image data wants #rrggbb instead of color names
+        if color not in self.hex_colors:
+            red, green, blue = self.canvas.winfo_rgb(color)
+            self.hex_colors[color] = f"#{red >> 8:02x}{green >> 8:02x}{blue >> 8:02x}"
+        return self.hex_colors[color]
@@ -0,0 +1,176 @@
+from heapq import heappop, heappush
+from typing import Iterator
+
+from pathfinding import ExpandEvent, Grid, PathEvent, Pathfinding, SearchEvent, SearchStats
+
+class IncrementalPlanner:
+    INFINITY = float("inf")
+
+    def __init__(self, grid:Grid, goal:int) -> None:
+        self.grid = grid
+        self.goal = goal
+        self.goal_node = grid.node(goal)
+
+        # D* Lite searches backwards from the goal, g and rhs survive between calls
+        self.g = [IncrementalPlanner.INFINITY] * len(grid.cells)
+        self.rhs = [IncrementalPlanner.INFINITY] * len(grid.cells)
+        self.rhs[self.goal_node] = 0
+
+        # open list is a binary heap of (k1, k2, node), keys holds the live key of each queued node
+        self.open_list = []
+        self.keys = {}
+        self.km = 0
+        self.start_node = None
+
+        # start -> (grid version, path, cells on the path)
+        self.cache = {}
+
+        # stats of the search in progress, None when nobody asked for them
+        self.stats = None
+
+        self._push(self.goal_node, (self._heuristic(self.goal_node), 0))
+
+    def update_cells(self, cells:list[int]) -> None:
+        # the grid already holds the new walls and costs, repair only around the changed cells.
+        # entering a cell costs its terrain cost, so a cost change only moves the rhs of its neighbours
+        opened = False
+        changed = set()
+        for cell in cells:
+            node = self.grid.node(cell)
+            changed.add(cell)
+            opened = opened or not self.grid.cells[node]
+
+            self._update_vertex(node)
+            for offset in self.grid.offsets:
+                self._update_vertex(node + offset)
+
+        # a new wall off the path cannot make the path longer or shorter, an opened or repriced cell might
+        for start, (version, path, path_cells) in list(self.cache.items()):
+            if opened or not changed.isdisjoint(path_cells):
+                del self.cache[start]
+            else:
+                self.cache[start] = (self.grid.version, path, path_cells)
+
+    def iter_find_path(self, start:int, trace:bool=True, stats:SearchStats=None) -> Iterator[SearchEvent]:
+        cached = self.cache.get(start)
+        if cached is not None and cached[0] == self.grid.version:
+            yield PathEvent(path=cached[1])
+            return
+
+        start_node = self.grid.node(start)
+        if self.start_node is not None and self.start_node != start_node:
+            self.km += self._distance(self.start_node, start_node)
+        self.start_node = start_node
+
+        self.stats = stats
+        for node in self._compute_shortest_path():
+            if stats is not None:
+                stats.expand(self.grid.cell(node), len(self.keys))
+            if trace:
+                yield ExpandEvent(cell=self.grid.cell(node), frontier=[])
+        self.stats = None
+
+        path = self._extract_path()
+        self.cache[start] = (self.grid.version, path, set(path))
+        yield PathEvent(path=path)
+
+    def find_path(self, start:int, stats:SearchStats=None) -> list[int]:
+        return Pathfinding.find_path(self.iter_find_path(start, trace=False, stats=stats), stats)
+
+    def _compute_shortest_path(self) -> Iterator[int]:
+        g = self.g
+        rhs = self.rhs
+        start_node = self.start_node
+        cells = self.grid.cells
+
+        while self.open_list:
+            k1, k2, node = self.open_list[0]
+            if self.keys.get(node) != (k1, k2):
+                heappop(self.open_list)
+                if self.stats is not None:
+                    self.stats.pops += 1
+                continue
+
+            start_key = self._key(start_node)
+            if (k1, k2) >= start_key and rhs[start_node] == g[start_node]:
+                break
+
+            new_key = self._key(node)
+            if (k1, k2) < new_key:
+                self._push(node, new_key)
+                continue
+
+            heappop(self.open_list)
+            del self.keys[node]
+            if self.stats is not None:
+                self.stats.pops += 1
+
+            if g[node] > rhs[node]:
+                g[node] = rhs[node]
+            else:
+                g[node] = IncrementalPlanner.INFINITY
+                self._update_vertex(node)
+
+            for offset in self.grid.offsets:
+                if not cells[node + offset]:
+                    self._update_vertex(node + offset)
+
+            # report after the node is settled so stopping early leaves the state consistent
+            yield node
+
+    def _update_vertex(self, node:int) -> None:
+        cells = self.grid.cells
+        costs = self.grid.costs
+        if node != self.goal_node:
+            best = IncrementalPlanner.INFINITY
+            if not cells[node]:
+                for offset in self.grid.offsets:
+                    child = node + offset
+                    if cells[child]:
+                        continue
+                    child_g = self.g[child] + (1 if costs is None else costs[child])
+                    if child_g < best:
+                        best = child_g
+            self.rhs[node] = best
+
+        if self.g[node] != self.rhs[node]:
+            self._push(node, self._key(node))
+        else:
+            self.keys.pop(node, None)
+
+    def _extract_path(self) -> list[int]:
+        g = self.g
+        cells = self.grid.cells
+        node = self.start_node
+        if cells[node] or g[node] == IncrementalPlanner.INFINITY:
+            return []
+
+        # follow the cheapest step down to the goal, terrain cost of the next cell included
+        costs = self.grid.costs
+        step = g.__getitem__ if costs is None else lambda child: g[child] + costs[child]
+        result = [self.grid.cell(node)]
+        while node != self.goal_node:
+            node = min((node + offset for offset in self.grid.offsets if not cells[node + offset]), key=step)
+            result.append(self.grid.cell(node))
+        return result
+
+    def _key(self, node:int) -> tuple[float, float]:
+        best = min(self.g[node], self.rhs[node])
+        return (best + self._heuristic(node) + self.km, best)
+
+    def _heuristic(self, node:int) -> int:
+        # manhattan distance, every cell costs at least 1 so it stays admissible with terrain costs
+        if self.start_node is None:
+            return 0
+        return self._distance(self.start_node, node)
+
+    def _distance(self, a:int, b:int) -> int:
+        a_row, a_col = divmod(a, self.grid.stride)
+        b_row, b_col = divmod(b, self.grid.stride)
+        return abs(a_row - b_row) + abs(a_col - b_col)
+
+    def _push(self, node:int, key:tuple[float, float]) -> None:
+        self.keys[node] = key
+        heappush(self.open_list, (key[0], key[1], node))
+        if self.stats is not None:
+            self.stats.pushes += 1
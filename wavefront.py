@@ -0,0 +1,55 @@
+import numpy as np
+
+from pathfinding import Grid
+
+class Wavefront:
+    UNREACHABLE = -1
+
+    @staticmethod
+    def distance_field(grid:Grid, source:int) -> np.ndarray:
+        # zero-copy view of the padded cells, the wall border keeps neighbour offsets inside the map
+        unvisited = np.frombuffer(grid.cells, dtype=np.uint8) == Grid.FREE
+        dist = np.full(len(grid.cells), Wavefront.UNREACHABLE, dtype=np.int32)
+        offsets = np.array(grid.offsets, dtype=np.intp)
+
+        source_node = grid.node(source)
+        frontier = np.array([source_node], dtype=np.intp)
+        if not unvisited[source_node]:
+            frontier = frontier[:0]
+        unvisited[source_node] = False
+        dist[frontier] = 0
+
+        # every step expands the whole frontier at once
+        step = 0
+        while len(frontier):
+            step += 1
+            frontier = (frontier[:, None] + offsets).ravel()
+            frontier = np.unique(frontier[unvisited[frontier]])
+            unvisited[frontier] = False
+            dist[frontier] = step
+
+        return np.ascontiguousarray(dist.reshape(grid.height + 2, grid.stride)[1:-1, 1:-1])
+
+    @staticmethod
+    def path_to(field:np.ndarray, target:int) -> list[int]:
+        height, width = field.shape
+        row, col = divmod(target, width)
+        if field[row, col] == Wavefront.UNREACHABLE:
+            return []
+
+        # walk downhill from the target, some neighbour is always exactly one step closer
+        result = [target]
+        while field[row, col] > 0:
+            next_dist = field[row, col] - 1
+            if col + 1 < width and field[row, col + 1] == next_dist:
+                col += 1
+            elif col > 0 and field[row, col - 1] == next_dist:
+                col -= 1
+            elif row > 0 and field[row - 1, col] == next_dist:
+                row -= 1
+            else:
+                row += 1
+            result.append(row * width + col)
+
+        # reverse path
+        return result[::-1]